@@ -12,6 +12,7 @@ Usage:
     python3 scripts/agent_cli.py <agent_index> accept <offer_event_id> <buyer_pubkey> <amount>
     python3 scripts/agent_cli.py <agent_index> pay <seller_pubkey> <amount> <trade_id>
     python3 scripts/agent_cli.py <agent_index> deliver <buyer_pubkey> <source_file> <trade_id>
+    python3 scripts/agent_cli.py treasury
 """
 
 import asyncio
@@ -26,7 +27,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.nostr.client import NostrClient
 from src.nostr.event import Event
 from src.nostr.crypto import KeyPair, nip04_encrypt, nip04_decrypt
+from src.wallet.accrual import ledger_for
 from src.wallet.manager import WalletManager
+from src.wallet.remote import RemoteWallet, daemon_available
+from src.wallet.treasury import TreasuryStore
 from src.user.personality import AGENT_CONFIG
 
 
@@ -35,6 +39,20 @@ def load_config():
         return json.load(f)
 
 
+async def open_wallet(agent_id: str, config: dict):
+    """Use the wallet daemon if it is running, else open the wallet locally."""
+    if daemon_available():
+        wallet = RemoteWallet(agent_id)
+        try:
+            await wallet.initialize()
+            return wallet
+        except (ConnectionRefusedError, FileNotFoundError):
+            pass  # daemon went away after the check
+    wallet = WalletManager(agent_id, config["mint_url"], "data", ledger=ledger_for(agent_id, config))
+    await wallet.initialize()
+    return wallet
+
+
 async def get_agent(agent_index: int):
     """Initialize agent keypair and wallet."""
     config = load_config()
@@ -42,8 +60,7 @@ async def get_agent(agent_index: int):
     data_dir = os.path.join("data", agent_id)
 
     keypair = KeyPair.load(data_dir)
-    wallet = WalletManager(agent_id, config["mint_url"], "data")
-    await wallet.initialize()
+    wallet = await open_wallet(agent_id, config)
 
     return agent_id, keypair, wallet, config
 
@@ -72,7 +89,7 @@ async def cmd_chat(agent_index: int, message: str):
     event = Event(kind=1, content=message)
     event.sign(keypair)
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         resp = await asyncio.wait_for(ws.recv(), timeout=5)
     print(f"Posted: {message}")
 
@@ -93,22 +110,15 @@ async def cmd_listings(agent_index: int):
                 if msg[0] == "EOSE":
                     break
                 if msg[0] == "EVENT" and len(msg) >= 3:
-                    event = msg[2]
-                    content = json.loads(event["content"])
-                    d_tag = None
-                    price_tag = None
-                    for tag in event.get("tags", []):
-                        if len(tag) >= 2:
-                            if tag[0] == "d":
-                                d_tag = tag[1]
-                            elif tag[0] == "price":
-                                price_tag = int(tag[1])
+                    event = Event.from_wire(msg[2])
+                    content = json.loads(event.content)
+                    price = event.get_tag("price")
                     listings.append({
-                        "d_tag": d_tag,
+                        "d_tag": event.get_tag("d"),
                         "name": content.get("name"),
                         "category": content.get("category"),
-                        "price": content.get("price_sats", price_tag or 0),
-                        "seller_pubkey": event["pubkey"],
+                        "price": content.get("price_sats", int(price) if price else 0),
+                        "seller_pubkey": event.pubkey,
                         "quality": content.get("quality_score"),
                         "preview": content.get("preview", "")[:100],
                     })
@@ -170,7 +180,7 @@ async def cmd_create(agent_index: int, name: str, category: str, price: int, sou
     event.sign(keypair)
 
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         resp = await asyncio.wait_for(ws.recv(), timeout=5)
         resp_data = json.loads(resp)
         if resp_data[0] != "OK" or not resp_data[2]:
@@ -258,8 +268,7 @@ async def cmd_buy(agent_index: int, listing_d_tag: str, offer_sats: int):
     token = await wallet.create_payment(offer_sats)
 
     # Deposit into seller's wallet
-    seller_wallet = WalletManager(seller_agent_id, config["mint_url"], "data")
-    await seller_wallet.initialize()
+    seller_wallet = await open_wallet(seller_agent_id, config)
     received = await seller_wallet.receive_payment(token)
 
     # Copy program source
@@ -291,7 +300,7 @@ async def cmd_buy(agent_index: int, listing_d_tag: str, offer_sats: int):
     event.sign(keypair)
 
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         await asyncio.wait_for(ws.recv(), timeout=5)
 
     print(json.dumps({
@@ -350,7 +359,7 @@ async def cmd_offer(agent_index: int, listing_d_tag: str, offer_sats: int):
     event.sign(keypair)
 
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         await asyncio.wait_for(ws.recv(), timeout=5)
 
     print(json.dumps({
@@ -451,7 +460,7 @@ async def cmd_broadcast_status(agent_index: int):
     event.sign(keypair)
 
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         await asyncio.wait_for(ws.recv(), timeout=5)
 
     print(json.dumps({"status": "broadcast", "agent": agent_id, "balance": wallet.balance}, indent=2))
@@ -460,18 +469,11 @@ async def cmd_broadcast_status(agent_index: int):
 async def cmd_broadcast_treasury():
     """Broadcast treasury total via kind:4301."""
     import websockets
-    treasury_file = os.path.join("data", "treasury", "tokens.jsonl")
-    total = 0
-    entries = 0
-    if os.path.exists(treasury_file):
-        with open(treasury_file) as f:
-            for line in f:
-                try:
-                    entry = json.loads(line.strip())
-                    total += entry.get("amount", 0)
-                    entries += 1
-                except Exception:
-                    pass
+    store = TreasuryStore()
+    summary = store.summary()
+    store.close()
+    total = summary["total_sats"]
+    entries = summary["entries"]
 
     config = load_config()
     # Use user0's keypair to sign the treasury event
@@ -484,7 +486,7 @@ async def cmd_broadcast_treasury():
     event.sign(keypair)
 
     async with websockets.connect(config["relay_url"]) as ws:
-        await ws.send(json.dumps(["EVENT", event.to_dict()], ensure_ascii=False))
+        await ws.send(event.to_message())
         await asyncio.wait_for(ws.recv(), timeout=5)
 
     print(json.dumps({"status": "treasury_broadcast", "total_sats": total, "entries": entries}, indent=2))
@@ -546,8 +548,21 @@ async def cmd_read_chat(since_ts: int = 0):
     print(json.dumps(messages, ensure_ascii=False))
 
 
+def cmd_treasury():
+    """Treasury totals with per-agent and per-reason breakdown."""
+    store = TreasuryStore()
+    report = store.summary()
+    report["by_agent"] = store.by_agent()
+    report["by_reason"] = store.by_reason()
+    store.close()
+    print(json.dumps(report, indent=2))
+
+
 async def main():
     # Special commands that don't need agent_index
+    if len(sys.argv) >= 2 and sys.argv[1] == "treasury":
+        cmd_treasury()
+        return
     if len(sys.argv) >= 2 and sys.argv[1] == "broadcast-all":
         await cmd_broadcast_all()
         return
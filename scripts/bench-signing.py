@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Microbenchmark: per-event Schnorr signing cost.
+
+Compares the old per-call path (sign_schnorr, which rebuilds a
+secp256k1.PrivateKey for every signature) against the long-lived
+KeyPair signer and its sign_many batch API.
+
+Usage: python3 scripts/bench-signing.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.nostr.crypto import KeyPair, sign_schnorr, verify_schnorr
+from src.nostr.event import Event
+
+
+def bench(label: str, n: int, fn) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    per_event = elapsed / n * 1e6
+    print(f"  {label:<34} {per_event:8.1f} us/event")
+    return per_event
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    keypair = KeyPair.generate()
+
+    events = [Event(kind=1, content=f"message {i}") for i in range(n)]
+    for event in events:
+        event.pubkey = keypair.public_key_hex
+        event.id = event.compute_id()
+    ids = [bytes.fromhex(e.id) for e in events]
+
+    print(f"=== Schnorr signing, {n} events ===")
+
+    before = bench(
+        "sign_schnorr (PrivateKey per call)", n,
+        lambda: [sign_schnorr(keypair.secret_key, i) for i in ids],
+    )
+    bench("KeyPair.sign", n, lambda: [keypair.sign(i) for i in ids])
+    after = bench("KeyPair.sign_many", n, lambda: keypair.sign_many(e.id for e in events))
+
+    sigs = keypair.sign_many(e.id for e in events[:10])
+    assert all(
+        verify_schnorr(keypair.public_key, bytes.fromhex(e.id), bytes.fromhex(s))
+        for e, s in zip(events, sigs)
+    )
+
+    print()
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 """Bootstrap wallets for all Zap Empire agents.
 
 Creates a Cashu wallet for each user agent (user0-user9) and mints
-initial sats using the FakeWallet backend.
+initial sats using the FakeWallet backend. All agents are minted
+concurrently over one pooled mint connection.
 """
 
 import asyncio
@@ -12,10 +13,14 @@ import sys
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Parallel mints in flight against the local mint
+MAX_CONCURRENT = 16
+
 
 async def main():
     from cashu.core.settings import settings
     from cashu.wallet.wallet import Wallet
+    from src.wallet import pool
 
     project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -38,29 +43,36 @@ async def main():
     print(f"Agents to bootstrap: {len(user_agents)}")
     print()
 
-    for agent in user_agents:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+
+    async def bootstrap(agent):
         agent_id = agent["id"]
         agent_name = agent["name"]
         wallet_dir = os.path.join(project_dir, "data", "wallets", agent_id)
         os.makedirs(wallet_dir, exist_ok=True)
 
-        try:
-            wallet = await Wallet.with_db(
-                url=mint_url,
-                db=wallet_dir,
-                name=agent_id,
-            )
-            await wallet.load_mint()
+        async with semaphore:
+            try:
+                wallet = await Wallet.with_db(
+                    url=mint_url,
+                    db=wallet_dir,
+                    name=agent_id,
+                )
+                await pool.attach(wallet, mint_url)
+                await wallet.load_mint()
+
+                # Mint initial tokens (cashu 0.18+ requires quote flow)
+                quote = await wallet.request_mint(initial_balance)
+                await wallet.mint(initial_balance, quote_id=quote.quote)
 
-            # Mint initial tokens (cashu 0.18+ requires quote flow)
-            quote = await wallet.request_mint(initial_balance)
-            await wallet.mint(initial_balance, quote_id=quote.quote)
+                balance = wallet.available_balance
+                print(f"  {agent_id} ({agent_name}): {balance} sats")
 
-            balance = wallet.available_balance
-            print(f"  {agent_id} ({agent_name}): {balance} sats")
+            except Exception as e:
+                print(f"  {agent_id} ({agent_name}): FAILED - {e}", file=sys.stderr)
 
-        except Exception as e:
-            print(f"  {agent_id} ({agent_name}): FAILED - {e}", file=sys.stderr)
+    await asyncio.gather(*(bootstrap(agent) for agent in user_agents))
+    await pool.close_shared()
 
     print()
     print("Bootstrap complete.")
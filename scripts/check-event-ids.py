@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Golden-vector check for NIP-01 event id computation.
+
+Compares Event.compute_id / serialize_for_id against the reference
+serialization (json.dumps with compact separators, ensure_ascii=False)
+over fixed vectors with tricky content: quotes, backslashes, control
+characters, newlines, non-ASCII and astral-plane text, U+2028/U+2029,
+empty and nested tags. Also checks that the memoized wire JSON parses
+back to the same fields.
+
+Usage: python3 scripts/check-event-ids.py
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.nostr.crypto import KeyPair
+from src.nostr import event as event_mod
+from src.nostr.event import Event
+
+PUBKEY = "7e7e9c42a91bfef19fa929e5fda1b72e0ebc1a4c1141673e2794234d86addf4e"
+
+# (kind, created_at, tags, content, expected id). The ids were produced by
+# the original json.dumps-based serializer and must never change.
+VECTORS = [
+    (1, 1700000000, [], "",
+     "313f9d310c07acf14852a03b3d12456d56e05371877feb9b3aa8a485aecf4311"),
+    (1, 1700000000, [], "ぼたんです！よろしくたん",
+     "53a810410a3f9947c77150795d8ba0b547e95055a71dfabdfe59b4e4f30691c8"),
+    (1, 1700000001, [["p", PUBKEY]], 'quote " backslash \\ slash /',
+     "cdf117373e656782896273a8351bb79d3f65c975b953996c315d4b894c30270f"),
+    (1, 1700000002, [], "line1\nline2\r\n\ttab \b\f \x00\x01\x1f\x7f",
+     "edf34d9a9bf77867655979e5b67e65ca920c568dce5f3beec27b8597a253ef1a"),
+    (1, 1700000003, [], "emoji \U0001F600 sep \u2028\u2029 nbsp \u00a0",
+     "f903997b9ef1106b05f2e691bffa84a8c6ce20091c95fbd117f7c71b6baeb2dd"),
+    (30078, 1700000004,
+     [["d", "uuid-1"], ["t", "python"], ["t", "math"], ["price", "12", "sat"], []],
+     '{"name": "gcd", "price_sats": 12}',
+     "af70964960d5c463cb771fc350924bf425ccc13aa6a6b648dc940d67d0a05a39"),
+    (4204, 1700000005,
+     [["p", PUBKEY], ["e", "ab" * 32, "", "reply"], ["offer_id", "1a2b3c4d"]],
+     "ZmFrZWNpcGhlcnRleHQ=?iv=AAAAAAAAAAAAAAAAAAAAAA==",
+     "593ff5cc750b4e06f5f44f0d1b035ccc22b40db41f4b828d7ab7f48bd2ca0f2a"),
+]
+
+
+def reference_id(pubkey, created_at, kind, tags, content) -> str:
+    data = [0, pubkey, created_at, kind, tags, content]
+    serialized = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def check(label: str) -> int:
+    failures = 0
+    for kind, created_at, tags, content, expected in VECTORS:
+        event = Event(kind=kind, content=content, tags=tags,
+                      pubkey=PUBKEY, created_at=created_at)
+        want = reference_id(PUBKEY, created_at, kind, tags, content)
+        got = event.compute_id()
+        if got != expected or want != expected:
+            failures += 1
+            print(f"  FAIL [{label}] kind={kind} content={content[:20]!r}: {got} != {expected}")
+
+    keypair = KeyPair.generate()
+    for kind, created_at, tags, content, _ in VECTORS:
+        event = Event(kind=kind, content=content, tags=tags, created_at=created_at)
+        event.sign(keypair)
+        if json.loads(event.to_json()) != event.to_dict() or not event.verify():
+            failures += 1
+            print(f"  FAIL [{label}] wire round-trip kind={kind}")
+    return failures
+
+
+def main():
+    failures = check("orjson" if event_mod.orjson else "json")
+    if event_mod.orjson is not None:
+        backend, event_mod.orjson = event_mod.orjson, None
+        failures += check("json")
+        event_mod.orjson = backend
+
+    if failures:
+        print(f"{failures} failure(s)")
+        sys.exit(1)
+    print(f"All {len(VECTORS)} vectors OK")
+
+
+if __name__ == "__main__":
+    main()
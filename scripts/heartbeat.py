@@ -17,6 +17,7 @@ import time
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.user.personality import AGENT_CONFIG
+from src.wallet.remote import daemon_available, request_sync
 
 STOP_FILE = "data/stop"
 TICK_INTERVAL = 90  # seconds between ticks
@@ -162,6 +163,12 @@ def call_llm(system_prompt, user_prompt):
 
 
 def get_balance(agent_idx):
+    # Ask the wallet daemon directly when it is up; no subprocess, no mint handshake
+    if daemon_available():
+        try:
+            return request_sync({"op": "balance", "agent": f"user{agent_idx}"})["result"]
+        except Exception as e:
+            log(f"    Wallet daemon query failed: {e}")
     out, _ = run_cli(agent_idx, "balance")
     try:
         return int(out)
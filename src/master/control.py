@@ -0,0 +1,224 @@
+"""Newline-delimited JSON control protocol for the supervisor socket.
+
+Every request and response is one JSON object on its own line:
+
+    -> {"v": 1, "id": 7, "cmd": "stop", "args": {"agents": ["user*"]}}
+    <- {"v": 1, "id": 7, "ok": true, "result": {"user0": {"ok": true}, ...}}
+    <- {"v": 1, "id": 8, "ok": false, "error": "unknown command: frobnicate"}
+
+A client may send any number of requests without waiting for replies.
+They are executed in the order sent and each reply carries the
+request's id.
+
+Commands (args in parentheses):
+
+    hello                       protocol version and command list
+    status (agents, group)      one record per agent
+    start / stop / restart (agents, group, timeout)
+                                bulk operation, result per agent
+    resources (agents, group, since, limit)
+                                recent resource samples per agent
+    shutdown                    stop everything
+    watch (agents, group, events)
+                                stream {"v": 1, "watch": id, "event": ...}
+                                objects until unwatch or disconnect
+    unwatch (watch)             end a watch stream
+
+"agents" is a list of agent ids or glob patterns; "group" is a
+manifest group ("users", "infra", or "all"). Watch events are "state"
+transitions, "sample" resource readings and "limit" violations (see
+resources.py); a watcher that cannot keep up loses its oldest events,
+and the next event reports how many were dropped.
+
+A first line that is not a JSON object is treated as a legacy
+whitespace-separated text command and answered in plain text.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+
+PROTOCOL_VERSION = 1
+
+COMMANDS = ("hello", "status", "resources", "start", "stop", "restart", "shutdown", "watch", "unwatch")
+
+logger = logging.getLogger("system-master")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class _Connection:
+    """One client: serialized writes plus its active watch streams."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.lock = asyncio.Lock()
+        self.watches = {}
+
+    async def send(self, message: dict):
+        data = json.dumps({"v": PROTOCOL_VERSION, **message}, separators=(",", ":")) + "\n"
+        async with self.lock:
+            self.writer.write(data.encode("utf-8"))
+            await self.writer.drain()
+
+
+class ControlServer:
+    """Serves the control protocol for a Supervisor on a Unix socket."""
+
+    def __init__(self, supervisor, path: str):
+        self.supervisor = supervisor
+        self.path = path
+        self.server = None
+        self._watch_ids = itertools.count(1)
+        self._connections = set()
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(
+            self._handle_client, path=self.path, limit=1024 * 1024
+        )
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        # Watchers would otherwise keep their connections open forever
+        for conn in self._connections:
+            conn.writer.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = _Connection(writer)
+        self._connections.add(conn)
+        try:
+            first = True
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if first and not line.lstrip().startswith(b"{"):
+                    await self._legacy(line, writer)
+                    break
+                first = False
+                await self._handle_line(conn, line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.error(f"Control client error: {e}")
+        finally:
+            self._connections.discard(conn)
+            for queue, task in conn.watches.values():
+                self.supervisor.unsubscribe(queue)
+                task.cancel()
+            writer.close()
+
+    async def _legacy(self, line: bytes, writer: asyncio.StreamWriter):
+        parts = line.decode("utf-8").split()
+        try:
+            response = await self.supervisor._execute_command(parts[0], parts[1:])
+        except Exception as e:
+            response = f"Error: {e}\n"
+        writer.write(response.encode("utf-8"))
+        await writer.drain()
+
+    async def _handle_line(self, conn: _Connection, line: bytes):
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise ProtocolError("invalid JSON")
+            if not isinstance(request, dict):
+                raise ProtocolError("request must be a JSON object")
+            request_id = request.get("id")
+            if request.get("v", PROTOCOL_VERSION) != PROTOCOL_VERSION:
+                raise ProtocolError(f"unsupported protocol version {request.get('v')}")
+            cmd = request.get("cmd")
+            if cmd not in COMMANDS:
+                raise ProtocolError(f"unknown command: {cmd}")
+            args = request.get("args") or {}
+            if not isinstance(args, dict):
+                raise ProtocolError("args must be an object")
+            result = await getattr(self, f"_cmd_{cmd}")(conn, args)
+        except ProtocolError as e:
+            await conn.send({"id": request_id, "ok": False, "error": str(e)})
+        except Exception as e:
+            logger.error(f"Control command failed: {e}")
+            await conn.send({"id": request_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+        else:
+            await conn.send({"id": request_id, "ok": True, "result": result})
+
+    def _targets(self, args: dict, required: bool = True) -> list:
+        patterns = args.get("agents")
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        group = args.get("group")
+        if not patterns and not group:
+            if required:
+                raise ProtocolError("no agents or group given")
+            return sorted(self.supervisor.agents)
+        targets = self.supervisor.resolve_targets(patterns, group)
+        if required and not targets:
+            raise ProtocolError("no agents match")
+        return targets
+
+    async def _cmd_hello(self, conn, args):
+        return {"protocol": PROTOCOL_VERSION, "commands": list(COMMANDS)}
+
+    async def _cmd_status(self, conn, args):
+        agents = self.supervisor.agents
+        return [self.supervisor.agent_status(agents[a]) for a in sorted(self._targets(args, required=False))]
+
+    async def _cmd_resources(self, conn, args):
+        sampler = self.supervisor.sampler
+        return {
+            agent_id: sampler.history_of(agent_id, args.get("since", 0), args.get("limit"))
+            for agent_id in sorted(self._targets(args, required=False))
+        }
+
+    async def _cmd_start(self, conn, args):
+        return await self.supervisor.start_agents(self._targets(args))
+
+    async def _cmd_stop(self, conn, args):
+        return await self.supervisor.stop_agents(self._targets(args), args.get("timeout"))
+
+    async def _cmd_restart(self, conn, args):
+        return await self.supervisor.restart_agents(self._targets(args), args.get("timeout"))
+
+    async def _cmd_shutdown(self, conn, args):
+        asyncio.create_task(self.supervisor.shutdown())
+        return "shutdown initiated"
+
+    async def _cmd_watch(self, conn, args):
+        agents = set(self._targets(args, required=False))
+        events = set(args.get("events") or ("state", "sample", "limit"))
+        watch_id = next(self._watch_ids)
+        queue = self.supervisor.subscribe()
+        task = asyncio.create_task(self._stream(conn, watch_id, queue, agents, events))
+        conn.watches[watch_id] = (queue, task)
+        return {"watch": watch_id, "agents": sorted(agents), "events": sorted(events)}
+
+    async def _cmd_unwatch(self, conn, args):
+        entry = conn.watches.pop(args.get("watch"), None)
+        if entry is None:
+            raise ProtocolError(f"no such watch: {args.get('watch')}")
+        queue, task = entry
+        self.supervisor.unsubscribe(queue)
+        task.cancel()
+        return {"watch": args.get("watch")}
+
+    async def _stream(self, conn: _Connection, watch_id: int, queue: asyncio.Queue, agents: set, events: set):
+        try:
+            while True:
+                event = await queue.get()
+                if event["event"] not in events or event.get("agent") not in agents:
+                    continue
+                message = {"watch": watch_id, **event}
+                if queue.dropped:
+                    message["dropped"] = queue.dropped
+                    queue.dropped = 0
+                await conn.send(message)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
@@ -0,0 +1,190 @@
+"""Index over agent logs for time and trade lookups.
+
+Scans logs/<agent>/{stdout,stderr}.log and their rotated .N.gz segments
+and keeps, in logs/index.db (SQLite):
+
+- segments: for every log file, the time range it covers, keyed by
+  inode so a segment is recognised after rotation renames it; the live
+  file is indexed incrementally from the last indexed byte.
+- offers: every JSON log line carrying an offer_id, so a trade can be
+  followed across all agents without reading the logs again.
+
+Lines that are not JSON objects with a "ts" (tracebacks written to
+stderr by the interpreter, relay/mint output) are skipped.
+Usage: python -m src.master.logindex [--offer <offer_id>]
+"""
+
+import gzip
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    dir TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    indexed_bytes INTEGER NOT NULL,
+    first_ts REAL,
+    last_ts REAL,
+    PRIMARY KEY (dir, inode)
+);
+CREATE TABLE IF NOT EXISTS offers (
+    offer_id TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    ts REAL NOT NULL,
+    level TEXT,
+    kind INTEGER,
+    line TEXT NOT NULL UNIQUE
+);
+CREATE INDEX IF NOT EXISTS offers_by_id ON offers(offer_id, ts);
+CREATE INDEX IF NOT EXISTS offers_by_agent ON offers(agent, ts);
+"""
+
+
+def parse_ts(value: str) -> float:
+    """"2026-10-16T12:00:00.123Z" -> epoch seconds."""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def parse_line(line: bytes) -> Optional[dict]:
+    """A structured log line as a dict, or None for anything else."""
+    if not line.startswith(b"{"):
+        return None
+    try:
+        entry = json.loads(line)
+        entry["_ts"] = parse_ts(entry["ts"])
+    except (ValueError, KeyError, TypeError):
+        return None
+    return entry
+
+
+class LogIndex:
+    """Incrementally maintained index of the logs directory."""
+
+    def __init__(self, logs_dir: str):
+        self.logs_dir = Path(logs_dir)
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.logs_dir / "index.db"), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def update(self):
+        """Bring the index up to date with the files on disk."""
+        for agent_dir in sorted(p for p in self.logs_dir.iterdir() if p.is_dir()):
+            self._update_dir(agent_dir)
+        self.conn.commit()
+
+    def _update_dir(self, agent_dir: Path):
+        known = {
+            inode: (path, size, indexed)
+            for inode, path, size, indexed in self.conn.execute(
+                "SELECT inode, path, size, indexed_bytes FROM segments WHERE dir = ?",
+                (agent_dir.name,),
+            )
+        }
+        present = set()
+        for path in agent_dir.iterdir():
+            if not (path.name.startswith("stdout.log") or path.name.startswith("stderr.log")):
+                continue
+            st = path.stat()
+            present.add(st.st_ino)
+            compressed = path.suffix == ".gz"
+            previous = known.get(st.st_ino)
+            if previous is not None:
+                _, size, indexed = previous
+                if compressed and size == st.st_size:
+                    # Same segment, renamed by a later rotation
+                    self.conn.execute(
+                        "UPDATE segments SET path = ? WHERE dir = ? AND inode = ?",
+                        (str(path), agent_dir.name, st.st_ino),
+                    )
+                    continue
+                if not compressed and indexed <= st.st_size:
+                    self._scan(agent_dir.name, path, st, start=indexed)
+                    continue
+            self._scan(agent_dir.name, path, st, start=0)
+        for inode in set(known) - present:
+            self.conn.execute(
+                "DELETE FROM segments WHERE dir = ? AND inode = ?", (agent_dir.name, inode)
+            )
+
+    def _scan(self, dir_name: str, path: Path, st: os.stat_result, start: int):
+        """Index a file from byte offset start (0 for compressed segments)."""
+        opener = gzip.open if path.suffix == ".gz" else open
+        first_ts = last_ts = None
+        offers = []
+        with opener(path, "rb") as f:
+            if start:
+                f.seek(start)
+            indexed = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partial last line, pick it up next time
+                indexed += len(line)
+                entry = parse_line(line)
+                if entry is None:
+                    continue
+                ts = entry["_ts"]
+                first_ts = ts if first_ts is None else first_ts
+                last_ts = ts
+                if entry.get("offer_id"):
+                    offers.append((
+                        entry["offer_id"], entry.get("agent") or dir_name, ts,
+                        entry.get("level"), entry.get("kind"), line.decode("utf-8").rstrip("\n"),
+                    ))
+        if path.suffix == ".gz":
+            indexed = st.st_size
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO offers (offer_id, agent, ts, level, kind, line) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            offers,
+        )
+        self.conn.execute(
+            "INSERT INTO segments (dir, inode, path, size, indexed_bytes, first_ts, last_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (dir, inode) DO UPDATE SET path = excluded.path, size = excluded.size, "
+            "indexed_bytes = excluded.indexed_bytes, "
+            "first_ts = CASE WHEN ? = 0 THEN excluded.first_ts ELSE COALESCE(first_ts, excluded.first_ts) END, "
+            "last_ts = COALESCE(excluded.last_ts, last_ts)",
+            (dir_name, st.st_ino, str(path), st.st_size, indexed, first_ts, last_ts, start),
+        )
+
+    def offer(self, offer_id: str) -> List[str]:
+        """Every log line about a trade, across all agents, in time order."""
+        rows = self.conn.execute(
+            "SELECT line FROM offers WHERE offer_id = ? ORDER BY ts", (offer_id,)
+        )
+        return [line for (line,) in rows]
+
+    def segments(self, agent: Optional[str] = None, since: float = 0, until: float = float("inf")) -> List[str]:
+        """Log files (oldest first) that may hold lines in [since, until]."""
+        query = "SELECT path FROM segments WHERE COALESCE(last_ts, 1e18) >= ? AND COALESCE(first_ts, 0) <= ?"
+        params: list = [since, until]
+        if agent:
+            query += " AND dir = ?"
+            params.append(agent)
+        query += " ORDER BY first_ts"
+        return [path for (path,) in self.conn.execute(query, params)]
+
+
+def main():
+    project_dir = Path(__file__).resolve().parents[2]
+    index = LogIndex(str(project_dir / "logs"))
+    index.update()
+    if len(sys.argv) >= 3 and sys.argv[1] == "--offer":
+        for line in index.offer(sys.argv[2]):
+            print(line)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
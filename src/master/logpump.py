@@ -0,0 +1,159 @@
+"""Async log pump: child output over pipes into rotated, compressed files.
+
+Each agent's stdout and stderr are pipes read by the supervisor. The
+bytes are buffered in memory and written in batches (every
+flush_interval, or sooner once flush_bytes are pending) from a worker
+thread, so the event loop never waits on the disk and ten chatty agents
+cost a few large writes instead of a syscall per line.
+
+When the current file would exceed max_bytes it is rotated:
+
+    stdout.log -> stdout.log.1 -> (gzip in background) stdout.log.1.gz
+
+keeping at most max_files rotated segments. A pump holds at most
+max_pending bytes; a reader that gets further ahead than that waits,
+which back-pressures only the agent that is producing the output.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+from typing import Optional
+
+logger = logging.getLogger("system-master")
+
+
+class LogPump:
+    """Batched, rotating writer for one log file."""
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        max_files: int = 5,
+        flush_interval: float = 0.2,
+        flush_bytes: int = 64 * 1024,
+        max_pending: int = 4 * 1024 * 1024,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_pending = max_pending
+        self._buffer = bytearray()
+        self._file = None
+        self._size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._closing = False
+        self._compressing: Optional[asyncio.Future] = None
+        self._writer = asyncio.create_task(self._write_loop())
+        self.bytes_written = 0
+        self.rotations = 0
+
+    async def write(self, data: bytes):
+        """Queue bytes; waits only if this pump is max_pending behind."""
+        while len(self._buffer) >= self.max_pending:
+            self._drained.clear()
+            self._wakeup.set()
+            await self._drained.wait()
+        self._buffer += data
+        if len(self._buffer) >= self.flush_bytes:
+            self._wakeup.set()
+
+    async def pipe(self, stream: asyncio.StreamReader):
+        """Copy a child's pipe into this log until EOF."""
+        while True:
+            data = await stream.read(65536)
+            if not data:
+                return
+            await self.write(data)
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while not (self._closing and not self._buffer):
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._buffer:
+                continue
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            self._drained.set()
+            # A full disk or a failed rotation loses this batch, never the
+            # pump: writers must keep draining or the agent's pipe fills up
+            try:
+                if self._size > 0 and self._size + len(data) > self.max_bytes:
+                    await self._rotate()
+                await loop.run_in_executor(None, self._write, data)
+            except Exception as e:
+                logger.error(f"Log write to {self.path} failed, dropped {len(data)} bytes: {e}")
+                if self._file is not None:
+                    try:
+                        self._file.close()
+                    except OSError:
+                        pass
+                    self._file = None  # reopen on the next batch
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "ab")
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        self.bytes_written += len(data)
+
+    def _segment(self, n: int) -> str:
+        return f"{self.path}.{n}.gz"
+
+    def _shift_segments(self):
+        """stdout.log.N.gz -> N+1 (dropping the oldest), stdout.log -> .1"""
+        oldest = self._segment(self.max_files)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for n in range(self.max_files - 1, 0, -1):
+            if os.path.exists(self._segment(n)):
+                os.replace(self._segment(n), self._segment(n + 1))
+        os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    async def _rotate(self):
+        loop = asyncio.get_running_loop()
+        if self._compressing is not None:
+            # Never shift segments while the previous one is being compressed
+            compressing, self._compressing = self._compressing, None
+            await compressing
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        await loop.run_in_executor(None, self._shift_segments)
+        self._size = 0
+        self._compressing = loop.run_in_executor(None, _compress, f"{self.path}.1", self._segment(1))
+
+    async def close(self):
+        """Flush everything queued, then close the file."""
+        self._closing = True
+        self._wakeup.set()
+        await self._writer
+        if self._compressing is not None:
+            try:
+                await self._compressing
+            except Exception as e:
+                logger.error(f"Compressing {self.path}.1 failed: {e}")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _compress(src: str, dst: str):
+    with open(src, "rb") as fin, gzip.open(dst + ".tmp", "wb", compresslevel=6) as fout:
+        shutil.copyfileobj(fin, fout, 1024 * 1024)
+    os.replace(dst + ".tmp", dst)
+    os.remove(src)
@@ -0,0 +1,248 @@
+"""Merged, filtered, rotation-aware tail over many agents' logs.
+
+Used by `zapctl logs`. Reads logs/<agent>/{stdout,stderr}.log directly
+(no tail processes), merges lines from all selected agents by their
+JSON "ts", filters by level, regex and offer_id, and keeps following
+through rotations: when a file is renamed away, the remainder of the
+old file is drained before the new one is opened from the start.
+
+On Linux, following sleeps on inotify watches of the agent log
+directories and wakes as soon as anything is written; elsewhere it
+polls.
+"""
+
+import ctypes
+import ctypes.util
+import fnmatch
+import gzip
+import heapq
+import logging
+import os
+import re
+import select
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .logindex import LogIndex, parse_line
+
+LEVELS = {name: logging.getLevelName(name) for name in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")}
+
+# One log line: (sort key, agent, stream, raw line, parsed entry or None)
+Line = Tuple[float, str, str, bytes, Optional[dict]]
+
+
+class LineFilter:
+    def __init__(self, level: Optional[str] = None, pattern: Optional[str] = None, offer_id: Optional[str] = None):
+        self.min_level = LEVELS[level.upper()] if level else 0
+        self.regex = re.compile(pattern.encode("utf-8")) if pattern else None
+        self.offer_id = offer_id
+
+    def __call__(self, line: Line) -> bool:
+        _, _, _, raw, entry = line
+        if self.min_level:
+            if entry is None or LEVELS.get(entry.get("level"), 0) < self.min_level:
+                return False
+        if self.offer_id and (entry is None or entry.get("offer_id") != self.offer_id):
+            return False
+        if self.regex and not self.regex.search(raw):
+            return False
+        return True
+
+
+def select_agents(logs_dir: Path, selectors: List[str]) -> List[str]:
+    """Agent directories matching ids or glob patterns (all if none given)."""
+    agents = sorted(p.name for p in logs_dir.iterdir() if p.is_dir()) if logs_dir.exists() else []
+    if not selectors or "all" in selectors:
+        return agents
+    return [a for a in agents if any(fnmatch.fnmatch(a, s) for s in selectors)]
+
+
+def _parse(lines: Iterable[bytes], agent: str, stream: str, last_ts: float = 0.0) -> Iterator[Line]:
+    """Attach a timestamp to every line; non-JSON lines inherit the previous one."""
+    for raw in lines:
+        entry = parse_line(raw)
+        if entry is not None:
+            last_ts = entry["_ts"]
+        yield (last_ts, agent, stream, raw.rstrip(b"\n"), entry)
+
+
+class Follower:
+    """Reads complete new lines from one log path, across rotations."""
+
+    def __init__(self, path: Path, agent: str, stream: str, from_end: bool = True):
+        self.path = path
+        self.agent = agent
+        self.stream = stream
+        self.file = None
+        self.inode = None
+        self.partial = b""
+        self.last_ts = 0.0
+        self._open(from_end)
+
+    def _open(self, at_end: bool) -> bool:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        self.file = f
+        self.inode = os.fstat(f.fileno()).st_ino
+        if at_end:
+            f.seek(0, os.SEEK_END)
+        return True
+
+    def read(self) -> List[Line]:
+        if self.file is None and not self._open(False):
+            return []
+        lines = self._drain()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return lines
+        if st.st_ino != self.inode:
+            # Rotated: the old file was drained above, continue in the new one
+            self.file.close()
+            self.file = None
+            if self._open(False):
+                lines += self._drain()
+        elif st.st_size < self.file.tell():
+            self.file.seek(0)  # truncated in place
+        return lines
+
+    def _drain(self) -> List[Line]:
+        data = self.partial + self.file.read()
+        if not data:
+            return []
+        complete, sep, self.partial = data.rpartition(b"\n")
+        if not sep:
+            return []
+        lines = list(_parse((l + b"\n" for l in complete.split(b"\n")), self.agent, self.stream, self.last_ts))
+        if lines:
+            self.last_ts = lines[-1][0]
+        return lines
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def _tail_bytes(path: Path, n: int, block: int = 65536) -> List[bytes]:
+    """The last n lines of a file, reading backwards from the end."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.split(b"\n")
+    if data.endswith(b"\n"):
+        lines.pop()
+    return [l + b"\n" for l in lines[-n:]]
+
+
+def backlog(logs_dir: Path, agents: List[str], streams: List[str], lines: int,
+            line_filter: LineFilter, since: Optional[float] = None) -> List[Line]:
+    """Initial lines to show, merged across agents by timestamp.
+
+    With since, reads every segment (rotated ones included, found via
+    the log index) that overlaps the window; otherwise the last `lines`
+    matching lines of each live file.
+    """
+    per_file = []
+    if since is not None:
+        index = LogIndex(str(logs_dir))
+        index.update()
+        for agent in agents:
+            for path in index.segments(agent, since=since):
+                stream = Path(path).name.split(".")[0]
+                if stream not in streams:
+                    continue
+                opener = gzip.open if path.endswith(".gz") else open
+                with opener(path, "rb") as f:
+                    per_file.append([l for l in _parse(f, agent, stream) if l[0] >= since and line_filter(l)])
+        index.close()
+    else:
+        for agent in agents:
+            for stream in streams:
+                path = logs_dir / agent / f"{stream}.log"
+                if not path.exists():
+                    continue
+                # Read extra lines so filtering still leaves enough
+                parsed = [l for l in _parse(_tail_bytes(path, lines * 20), agent, stream) if line_filter(l)]
+                per_file.append(parsed[-lines:])
+    merged = list(heapq.merge(*per_file, key=lambda l: l[0]))
+    return merged if since is not None else merged[-lines:]
+
+
+class _Inotify:
+    """Minimal inotify wakeup source (Linux only)."""
+
+    IN_MODIFY = 0x002
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+
+    def __init__(self, dirs: List[Path]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_MOVED_TO | self.IN_CREATE
+        for d in dirs:
+            libc.inotify_add_watch(self.fd, str(d).encode(), mask)
+
+    def wait(self, timeout: float):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def follow(logs_dir: Path, agents: List[str], streams: List[str], line_filter: LineFilter) -> Iterator[Line]:
+    """Yield new matching lines from all agents until interrupted."""
+    followers = [
+        Follower(logs_dir / agent / f"{stream}.log", agent, stream)
+        for agent in agents for stream in streams
+    ]
+    try:
+        waker = _Inotify([logs_dir / agent for agent in agents])
+    except (OSError, AttributeError):
+        waker = None
+    try:
+        while True:
+            batch = []
+            for follower in followers:
+                batch += [l for l in follower.read() if line_filter(l)]
+            batch.sort(key=lambda l: l[0])
+            yield from batch
+            if waker:
+                # Also wake periodically, to catch files in dirs created later
+                waker.wait(1.0)
+            else:
+                time.sleep(0.25)
+    finally:
+        for follower in followers:
+            follower.close()
+        if waker:
+            waker.close()
+
+
+def format_line(line: Line, raw_json: bool = False) -> str:
+    _, agent, stream, raw, entry = line
+    text = raw.decode("utf-8", errors="replace")
+    if raw_json:
+        return text
+    if entry is None:
+        return f"{'':<24} {agent:<12} {text}"
+    extra = "".join(
+        f" [{k}={entry[k]}]" for k in ("tick", "offer_id", "kind") if entry.get(k) is not None
+    )
+    return f"{entry['ts']} {entry.get('agent') or agent:<12} {entry.get('level', ''):<8} {entry.get('msg', '')}{extra}"
@@ -0,0 +1,130 @@
+"""Async readiness probes for supervised agents.
+
+A probe is a coroutine function that returns True once the agent can
+actually serve requests. Probes are declared per agent in
+config/agents.json:
+
+    "probe": {"type": "relay", "url": "ws://127.0.0.1:7777"}
+    "probe": {"type": "http", "url": "http://127.0.0.1:3338/v1/info"}
+    "probe": {"type": "tcp", "host": "127.0.0.1", "port": 7777}
+    "probe": {"type": "unix", "path": "data/wallet-daemon/wallet.sock"}
+    "probe": {"type": "exec", "command": "scripts/check.sh"}
+
+Further types can be added with register_probe().
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+Probe = Callable[..., Awaitable[bool]]
+
+PROBES: Dict[str, Probe] = {}
+
+
+def register_probe(name: str):
+    """Decorator registering a probe under a manifest "type" name."""
+    def decorator(fn: Probe) -> Probe:
+        PROBES[name] = fn
+        return fn
+    return decorator
+
+
+@register_probe("tcp")
+async def tcp_probe(host: str, port: int) -> bool:
+    """Port accepts connections."""
+    _, writer = await asyncio.open_connection(host, port)
+    writer.close()
+    return True
+
+
+@register_probe("unix")
+async def unix_probe(path: str) -> bool:
+    """Unix socket accepts connections."""
+    _, writer = await asyncio.open_unix_connection(path)
+    writer.close()
+    return True
+
+
+@register_probe("relay")
+async def relay_probe(url: str) -> bool:
+    """Nostr relay answers a REQ with EOSE."""
+    import websockets
+
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps(["REQ", "ready-probe", {"limit": 0}]))
+        while True:
+            msg = json.loads(await ws.recv())
+            if msg[:2] == ["EOSE", "ready-probe"]:
+                await ws.send(json.dumps(["CLOSE", "ready-probe"]))
+                return True
+
+
+@register_probe("http")
+async def http_probe(url: str) -> bool:
+    """GET url returns 2xx (e.g. the mint's /v1/info)."""
+    parts = urlsplit(url)
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        writer.write(
+            f"GET {parts.path or '/'} HTTP/1.0\r\nHost: {parts.netloc}\r\n\r\n".encode("ascii")
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+    finally:
+        writer.close()
+    status = status_line.split()
+    return len(status) >= 2 and status[1].startswith(b"2")
+
+
+@register_probe("exec")
+async def exec_probe(command: str, cwd: Optional[str] = None) -> bool:
+    """Shell command exits 0.
+
+    The command runs in its own session; if the probe is cancelled (by
+    wait_ready's per-attempt timeout) the whole group is killed, so a
+    hung check does not outlive its attempt.
+    """
+    process = await asyncio.create_subprocess_shell(
+        command,
+        cwd=cwd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        return await process.wait() == 0
+    finally:
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+
+async def wait_ready(spec: dict, timeout: float = 60, interval: float = 0.1) -> bool:
+    """Run the probe in spec until it succeeds or timeout expires.
+
+    The retry interval starts short so a fast service is seen as ready
+    almost immediately, and grows to 1s for slow ones.
+    """
+    params = dict(spec)
+    probe = PROBES[params.pop("type")]
+    params.pop("timeout", None)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        try:
+            if await asyncio.wait_for(probe(**params), timeout=min(remaining, 5)):
+                return True
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+        interval = min(interval * 2, 1.0)
@@ -0,0 +1,226 @@
+"""Per-agent resource accounting and limits.
+
+Every agent is started in its own session, so its process group id is
+its PID and covers everything it forks (strfry, nutshell workers, the
+sandbox). ResourceSampler reads /proc once per round and sums, per
+group:
+
+    cpu_seconds  user + system time (including reaped children)
+    cpu          percent of one CPU since the previous sample
+    rss          resident memory in bytes
+    fds          open file descriptors
+    ctxsw        voluntary + involuntary context switches (main threads)
+    procs        processes in the group
+
+Samples also carry the group's pid, so a series that spans restarts can
+be split per process.
+
+Limits are declared per agent in config/agents.json:
+
+    "limits": {
+        "soft": {"rss_mb": 200, "cpu_percent": 80, "fds": 256},
+        "hard": {"rss_mb": 400, "fds": 1024},
+        "sustain": 3
+    }
+
+Soft limits are checked by the supervisor on each sample; an agent over
+one for `sustain` consecutive samples is restarted. Hard limits restart
+the agent on the first sample over them and are also handed to the
+kernel: through a cgroup v2 (memory.max, cpu.max) when the supervisor
+can create cgroups, otherwise as rlimits (rss_mb becomes RLIMIT_AS,
+which counts address space rather than resident memory, so leave
+headroom). fds is always RLIMIT_NOFILE.
+"""
+
+import logging
+import os
+import resource
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("system-master")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+MiB = 1024 * 1024
+
+# sample key and scale for each limit name
+LIMIT_METRICS = {
+    "rss_mb": ("rss", MiB),
+    "cpu_percent": ("cpu", 1),
+    "fds": ("fds", 1),
+}
+
+
+def _read_stat(pid: str):
+    """(pgrp, cpu ticks, rss pages) from /proc/<pid>/stat."""
+    with open(f"/proc/{pid}/stat", "rb") as f:
+        data = f.read()
+    # comm may contain spaces and parentheses; fields start after the last ")"
+    fields = data[data.rindex(b")") + 2:].split()
+    ticks = int(fields[11]) + int(fields[12]) + int(fields[13]) + int(fields[14])
+    return int(fields[2]), ticks, int(fields[21])
+
+
+def _read_ctxsw(pid: str) -> int:
+    total = 0
+    with open(f"/proc/{pid}/status", "rb") as f:
+        for line in f:
+            if line.startswith((b"voluntary_ctxt_switches:", b"nonvoluntary_ctxt_switches:")):
+                total += int(line.split()[1])
+    return total
+
+
+def _count_fds(pid: str) -> int:
+    try:
+        return len(os.listdir(f"/proc/{pid}/fd"))
+    except PermissionError:
+        return 0
+
+
+class ResourceSampler:
+    """Samples process groups from /proc and keeps a rolling series per agent.
+
+    read_groups() only reads /proc and may run in a worker thread;
+    record() and the accessors touch the series and must all run on the
+    event loop.
+    """
+
+    def __init__(self, history: int = 720):
+        self.history = history
+        self.series: Dict[str, deque] = {}
+        self._last: Dict[str, tuple] = {}  # agent -> (pgid, wall time, cpu seconds)
+
+    def read_groups(self, pgids: Dict[int, str]) -> Dict[str, dict]:
+        """Raw totals per agent for the given {pgid: agent} in one /proc scan."""
+        totals = {agent: {"cpu_seconds": 0.0, "rss": 0, "fds": 0, "ctxsw": 0, "procs": 0} for agent in pgids.values()}
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                pgrp, ticks, rss_pages = _read_stat(pid)
+                agent = pgids.get(pgrp)
+                if agent is None:
+                    continue
+                total = totals[agent]
+                total["cpu_seconds"] += ticks / CLOCK_TICKS
+                total["rss"] += rss_pages * PAGE_SIZE
+                total["fds"] += _count_fds(pid)
+                total["ctxsw"] += _read_ctxsw(pid)
+                total["procs"] += 1
+            except (FileNotFoundError, ProcessLookupError, ValueError, IndexError):
+                continue  # exited while we were reading it
+        return totals
+
+    def record(self, pgids: Dict[int, str], totals: Dict[str, dict], now: float) -> Dict[str, dict]:
+        """Turn read_groups() totals into samples, append them to the series and return them."""
+        samples = {}
+        for pgid, agent in pgids.items():
+            total = totals[agent]
+            last = self._last.get(agent)
+            cpu = None
+            if last and last[0] == pgid and now > last[1]:
+                cpu = max(0.0, (total["cpu_seconds"] - last[2]) / (now - last[1]) * 100)
+            self._last[agent] = (pgid, now, total["cpu_seconds"])
+            sample = {"ts": now, "pid": pgid, "cpu": round(cpu, 1) if cpu is not None else None, **total}
+            sample["cpu_seconds"] = round(sample["cpu_seconds"], 2)
+            self.series.setdefault(agent, deque(maxlen=self.history)).append(sample)
+            samples[agent] = sample
+        return samples
+
+    def latest(self, agent: str) -> Optional[dict]:
+        series = self.series.get(agent)
+        return series[-1] if series else None
+
+    def history_of(self, agent: str, since: float = 0, limit: Optional[int] = None) -> List[dict]:
+        samples = [s for s in self.series.get(agent, ()) if s["ts"] >= since]
+        return samples[-limit:] if limit else samples
+
+
+def exceeded(limits: Optional[dict], sample: dict) -> Optional[tuple]:
+    """(limit name, value, threshold) for the first limit the sample is over."""
+    for name, threshold in (limits or {}).items():
+        if name not in LIMIT_METRICS:
+            continue
+        key, scale = LIMIT_METRICS[name]
+        value = sample.get(key)
+        if value is not None and value / scale > threshold:
+            return name, round(value / scale, 1), threshold
+    return None
+
+
+class Cgroups:
+    """A delegated cgroup v2 subtree with one child cgroup per agent."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @classmethod
+    def detect(cls) -> Optional["Cgroups"]:
+        """Set up the subtree, or None if cgroup v2 is unavailable or not writable.
+
+        Controllers can only be enabled for children of a cgroup that has
+        no processes of its own, so the supervisor first moves itself into
+        a "supervisor" leaf.
+        """
+        try:
+            with open("/proc/self/cgroup") as f:
+                unified = [l.strip()[3:] for l in f if l.startswith("0::")]
+            if not unified:
+                return None
+            root = Path("/sys/fs/cgroup") / unified[0].lstrip("/")
+            if not (root / "cgroup.controllers").exists():
+                return None
+            if root.name != "supervisor":
+                leaf = root / "supervisor"
+                leaf.mkdir(exist_ok=True)
+                (leaf / "cgroup.procs").write_text(str(os.getpid()))
+            else:
+                root = root.parent
+            available = (root / "cgroup.controllers").read_text().split()
+            wanted = [c for c in ("memory", "cpu") if c in available]
+            if wanted:
+                (root / "cgroup.subtree_control").write_text(" ".join(f"+{c}" for c in wanted))
+            return cls(root)
+        except OSError as e:
+            logger.info(f"cgroup v2 limits unavailable ({e}), using rlimits")
+            return None
+
+    def place(self, agent_id: str, pid: int, hard: dict):
+        group = self.root / agent_id
+        group.mkdir(exist_ok=True)
+        if "rss_mb" in hard:
+            (group / "memory.max").write_text(str(int(hard["rss_mb"] * MiB)))
+        if "cpu_percent" in hard:
+            period = 100000
+            (group / "cpu.max").write_text(f"{int(hard['cpu_percent'] / 100 * period)} {period}")
+        (group / "cgroup.procs").write_text(str(pid))
+
+    def remove(self, agent_id: str):
+        try:
+            (self.root / agent_id).rmdir()
+        except OSError:
+            pass
+
+
+def apply_hard_limits(agent_id: str, pid: int, hard: dict, cgroups: Optional[Cgroups]) -> str:
+    """Hand an agent's hard limits to the kernel; returns the mechanism used.
+
+    Applied right after spawn, so the agent's first moments of start-up
+    run unconstrained.
+    """
+    if not hard:
+        return ""
+    if "fds" in hard:
+        resource.prlimit(pid, resource.RLIMIT_NOFILE, (int(hard["fds"]), int(hard["fds"])))
+    if cgroups is not None:
+        try:
+            cgroups.place(agent_id, pid, hard)
+            return "cgroup"
+        except OSError as e:
+            logger.warning(f"Could not place {agent_id} in a cgroup ({e}), using rlimits")
+    if "rss_mb" in hard:
+        limit = int(hard["rss_mb"] * MiB)
+        resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+    return "rlimit"
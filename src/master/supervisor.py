@@ -6,13 +6,12 @@ Handles graceful shutdown, crash recovery, and restart policies.
 """
 
 import asyncio
+import fnmatch
 import json
 import logging
 import os
 import signal
-import socket
 import struct
-import subprocess
 import sys
 import time
 from dataclasses import dataclass, field
@@ -20,6 +19,11 @@ from enum import Enum
 from pathlib import Path
 from typing import Dict, Optional
 
+from . import probes
+from .control import ControlServer
+from .logpump import LogPump
+from .resources import Cgroups, ResourceSampler, apply_hard_limits, exceeded
+
 logger = logging.getLogger("system-master")
 
 
@@ -27,6 +31,8 @@ class AgentState(Enum):
     STOPPED = "STOPPED"
     STARTING = "STARTING"
     RUNNING = "RUNNING"
+    STOPPING = "STOPPING"
+    FAILED = "FAILED"  # hit the restart limit; only a manual start revives it
 
 
 class RestartPolicy(Enum):
@@ -42,20 +48,32 @@ class AgentInfo:
     command: str
     restart_policy: RestartPolicy
     tick_interval: Optional[int] = None
+    stop_timeout: float = 10.0
+    probe: Optional[dict] = None
+    depends_on: list = field(default_factory=list)
+    group: str = ""
+    limits: dict = field(default_factory=dict)
 
     # Runtime state
     state: AgentState = AgentState.STOPPED
     pid: Optional[int] = None
-    process: Optional[subprocess.Popen] = None
+    process: Optional[asyncio.subprocess.Process] = None
+    watcher: Optional[asyncio.Task] = None
+    stop_task: Optional[asyncio.Task] = None
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
     started_at: Optional[float] = None
     restart_count: int = 0
     last_restart_time: float = 0
     restart_backoff: float = 1.0
     restart_times: list = field(default_factory=list)
+    restart_handle: Optional[asyncio.TimerHandle] = None  # respawn waiting out its backoff
+    limit_strikes: int = 0
+    limit_restarts: int = 0
+    pending_limit_restart: bool = False  # cleared by a manual stop
 
-    # Log file handles
-    stdout_log: Optional[object] = None
-    stderr_log: Optional[object] = None
+    # Log pumps, kept across restarts
+    stdout_log: Optional[LogPump] = None
+    stderr_log: Optional[LogPump] = None
 
 
 class Supervisor:
@@ -64,6 +82,11 @@ class Supervisor:
     def __init__(self, project_dir: str, manifest_path: str = "config/agents.json"):
         self.project_dir = Path(project_dir)
         self.manifest_path = self.project_dir / manifest_path
+        constants_path = self.project_dir / "config" / "constants.json"
+        self.constants = {}
+        if constants_path.exists():
+            with open(constants_path) as f:
+                self.constants = json.load(f)
         self.agents: Dict[str, AgentInfo] = {}
         self.running = False
         self.pids_file = self.project_dir / "data" / "system-master" / "pids.json"
@@ -71,6 +94,13 @@ class Supervisor:
         # Control socket
         self.control_socket_path = self.project_dir / "data" / "system-master" / "control.sock"
         self.control_server = None
+        self._stopped = asyncio.Event()
+        self._watchers: set = set()
+
+        # Resource accounting
+        self.sampler = ResourceSampler(history=self.constants.get("resource_history", 720))
+        self.cgroups: Optional[Cgroups] = None
+        self._sample_task: Optional[asyncio.Task] = None
 
         # Ensure directories exist
         (self.project_dir / "data" / "system-master").mkdir(parents=True, exist_ok=True)
@@ -91,42 +121,113 @@ class Supervisor:
                 command=agent_def["command"],
                 restart_policy=RestartPolicy(restart_str),
                 tick_interval=agent_def.get("tick_interval"),
+                stop_timeout=agent_def.get("stop_timeout", 10.0),
+                probe=agent_def.get("probe"),
+                depends_on=agent_def.get("depends_on", []),
+                group=agent_def.get("group", "users" if agent_id.startswith("user") else "infra"),
+                limits=agent_def.get("limits", {}),
             )
 
         logger.info(f"Loaded {len(self.agents)} agents from manifest")
 
+    # --- State events ---
+
+    def _set_state(self, agent: AgentInfo, state: AgentState, **details):
+        """Change an agent's state and tell every watcher about it."""
+        old = agent.state
+        agent.state = state
+        if old != state:
+            self.emit({
+                "event": "state",
+                "agent": agent.agent_id,
+                "from": old.value,
+                "to": state.value,
+                "pid": agent.pid,
+                "ts": time.time(),
+                **details,
+            })
+
+    def emit(self, event: dict):
+        """Broadcast an event to watchers; a slow watcher loses its oldest events."""
+        for queue in self._watchers:
+            if queue.full():
+                queue.get_nowait()
+                queue.dropped += 1
+            queue.put_nowait(event)
+
+    def subscribe(self, maxsize: int = 1000) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize)
+        queue.dropped = 0
+        self._watchers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._watchers.discard(queue)
+
+    def resolve_targets(self, patterns=None, group: Optional[str] = None) -> list:
+        """Agent ids matching any glob in patterns and/or a group ("all" for every agent)."""
+        ids = []
+        for agent_id, agent in self.agents.items():
+            if group and (group == "all" or agent.group == group):
+                ids.append(agent_id)
+            elif patterns and any(fnmatch.fnmatch(agent_id, p) for p in patterns):
+                ids.append(agent_id)
+        return ids
+
+    def agent_status(self, agent: AgentInfo) -> dict:
+        sample = self.sampler.latest(agent.agent_id) if agent.state == AgentState.RUNNING else None
+        return {
+            "agent": agent.agent_id,
+            "name": agent.name,
+            "group": agent.group,
+            "state": agent.state.value,
+            "pid": agent.pid,
+            "started_at": agent.started_at,
+            "uptime": time.time() - agent.started_at
+            if agent.started_at and agent.state == AgentState.RUNNING else None,
+            "restarts": agent.restart_count,
+            "limit_restarts": agent.limit_restarts,
+            "cpu": sample["cpu"] if sample else None,
+            "rss": sample["rss"] if sample else None,
+            "fds": sample["fds"] if sample else None,
+            "procs": sample["procs"] if sample else None,
+        }
+
     def _get_log_dir(self, agent_id: str) -> Path:
         log_dir = self.project_dir / "logs" / agent_id
         log_dir.mkdir(parents=True, exist_ok=True)
         return log_dir
 
     def _open_logs(self, agent: AgentInfo):
-        """Open log files for an agent."""
+        """Create the agent's log pumps (once; they outlive restarts)."""
+        if agent.stdout_log is not None:
+            return
         log_dir = self._get_log_dir(agent.agent_id)
-        agent.stdout_log = open(log_dir / "stdout.log", "a", buffering=1)
-        agent.stderr_log = open(log_dir / "stderr.log", "a", buffering=1)
-
-    def _close_logs(self, agent: AgentInfo):
-        """Close log files for an agent."""
-        if agent.stdout_log:
-            agent.stdout_log.close()
-            agent.stdout_log = None
-        if agent.stderr_log:
-            agent.stderr_log.close()
-            agent.stderr_log = None
-
-    def spawn_agent(self, agent_id: str) -> bool:
+        max_bytes = int(self.constants.get("log_max_size_mb", 10) * 1024 * 1024)
+        max_files = self.constants.get("log_max_files", 5)
+        agent.stdout_log = LogPump(str(log_dir / "stdout.log"), max_bytes, max_files)
+        agent.stderr_log = LogPump(str(log_dir / "stderr.log"), max_bytes, max_files)
+
+    async def _close_logs(self):
+        """Flush and close every agent's log pumps."""
+        pumps = []
+        for agent in self.agents.values():
+            pumps += [p for p in (agent.stdout_log, agent.stderr_log) if p is not None]
+            agent.stdout_log = agent.stderr_log = None
+        await asyncio.gather(*(p.close() for p in pumps), return_exceptions=True)
+
+    async def spawn_agent(self, agent_id: str) -> bool:
         """Spawn a single agent process."""
         agent = self.agents.get(agent_id)
         if not agent:
             logger.error(f"Unknown agent: {agent_id}")
             return False
 
-        if agent.state != AgentState.STOPPED:
+        if agent.state not in (AgentState.STOPPED, AgentState.FAILED):
             logger.warning(f"{agent_id} is already {agent.state.value}")
             return False
 
-        agent.state = AgentState.STARTING
+        self._set_state(agent, AgentState.STARTING)
         self._open_logs(agent)
 
         # Parse command
@@ -144,67 +245,197 @@ class Supervisor:
             agent_data_dir = self.project_dir / "data" / agent_id
             agent_data_dir.mkdir(parents=True, exist_ok=True)
 
-            process = subprocess.Popen(
-                [cmd] + args,
-                stdout=agent.stdout_log,
-                stderr=agent.stderr_log,
+            process = await asyncio.create_subprocess_exec(
+                cmd, *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
                 cwd=str(self.project_dir),
                 env={**os.environ, "AGENT_ID": agent_id},
-                preexec_fn=os.setsid,  # New process group for clean shutdown
+                start_new_session=True,  # New process group for clean shutdown
             )
 
             agent.process = process
             agent.pid = process.pid
             agent.started_at = time.time()
-            agent.state = AgentState.RUNNING
+            if agent.limits.get("hard"):
+                try:
+                    how = apply_hard_limits(agent_id, process.pid, agent.limits["hard"], self.cgroups)
+                    logger.info(f"{agent_id} hard limits applied via {how}")
+                except OSError as e:
+                    logger.warning(f"Could not apply hard limits to {agent_id}: {e}")
+            self._set_state(agent, AgentState.RUNNING)
+            agent.watcher = asyncio.create_task(self._watch_process(agent, process))
+            asyncio.create_task(agent.stdout_log.pipe(process.stdout))
+            asyncio.create_task(agent.stderr_log.pipe(process.stderr))
             logger.info(f"Spawned {agent_id} ({agent.name}) PID={process.pid}")
             self._save_pids()
             return True
 
         except Exception as e:
             logger.error(f"Failed to spawn {agent_id}: {e}")
-            agent.state = AgentState.STOPPED
-            self._close_logs(agent)
+            self._set_state(agent, AgentState.STOPPED, error=str(e))
             return False
 
-    def stop_agent(self, agent_id: str, timeout: float = 10.0) -> bool:
+    async def stop_agent(self, agent_id: str, timeout: Optional[float] = None) -> bool:
         """Gracefully stop an agent (SIGTERM, then SIGKILL after timeout)."""
-        agent = self.agents.get(agent_id)
-        if not agent or agent.state == AgentState.STOPPED:
-            return True
-
-        if agent.process is None:
-            agent.state = AgentState.STOPPED
-            return True
+        await self.stop_agents([agent_id], timeout)
+        return True
 
-        logger.info(f"Stopping {agent_id} (PID={agent.pid})...")
+    async def stop_agents(self, agent_ids, timeout: Optional[float] = None):
+        """Stop several agents concurrently.
+
+        Every process group gets SIGTERM at once; each agent then has its
+        own deadline (timeout, or its manifest stop_timeout) before it is
+        sent SIGKILL, independently of the others. A stop already in
+        progress is joined rather than repeated. Returns a result per
+        requested agent.
+        """
+        tasks = []
+        for agent_id in agent_ids:
+            agent = self.agents.get(agent_id)
+            if not agent:
+                continue
+            # An explicit stop wins over a limit restart or backoff already under way
+            agent.pending_limit_restart = False
+            if agent.restart_handle is not None:
+                agent.restart_handle.cancel()
+                agent.restart_handle = None
+            if agent.state == AgentState.STOPPED:
+                continue
+            if agent.stop_task is None:
+                agent.stop_task = asyncio.create_task(
+                    self._terminate(agent, timeout if timeout is not None else agent.stop_timeout)
+                )
+            tasks.append(agent.stop_task)
+        if tasks:
+            await asyncio.gather(*tasks)
+        return {
+            agent_id: {"ok": True, "state": self.agents[agent_id].state.value}
+            if agent_id in self.agents else {"ok": False, "error": "unknown agent"}
+            for agent_id in agent_ids
+        }
+
+    async def start_agents(self, agent_ids) -> dict:
+        """Start several agents concurrently, in depends_on order.
+
+        Agents already running, or waiting out a restart backoff, are left
+        alone. An agent waits for those of its dependencies that are
+        started by the same call, as in start_all.
+        """
+        results = {}
+        to_start = []
+        for agent_id in agent_ids:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                results[agent_id] = {"ok": False, "error": "unknown agent"}
+            elif agent.state in (AgentState.RUNNING, AgentState.STARTING) or agent.restart_handle is not None:
+                results[agent_id] = {"ok": True, "pid": agent.pid, "already": True}
+            else:
+                # Cleared before any starter runs, so dependents wait for it
+                agent.ready.clear()
+                to_start.append(agent)
+
+        await asyncio.gather(*(self._start_when_ready(agent) for agent in to_start))
+        for agent in to_start:
+            if agent.state == AgentState.RUNNING:
+                results[agent.agent_id] = {"ok": True, "pid": agent.pid}
+            else:
+                results[agent.agent_id] = {"ok": False, "error": "spawn failed"}
+        return {agent_id: results[agent_id] for agent_id in agent_ids}
+
+    async def restart_agents(self, agent_ids, timeout: Optional[float] = None) -> dict:
+        await self.stop_agents(agent_ids, timeout)
+        return await self.start_agents(agent_ids)
+
+    def _signal_group(self, pid: int, sig: int):
+        """Signal the agent's whole process group (it was started in its own session)."""
+        try:
+            os.killpg(pid, sig)
+        except ProcessLookupError:
+            os.kill(pid, sig)
 
+    async def _terminate(self, agent: AgentInfo, timeout: float):
+        agent_id = agent.agent_id
         try:
-            agent.process.terminate()  # SIGTERM
+            if agent.pid is None:
+                return
+            logger.info(f"Stopping {agent_id} (PID={agent.pid})...")
+            # The exit watcher sees STOPPING and leaves the restart policy alone
+            self._set_state(agent, AgentState.STOPPING)
+            watcher = agent.watcher
+            if watcher is None:
+                watcher = asyncio.create_task(self._watch_pid(agent, agent.pid))
+
             try:
-                agent.process.wait(timeout=timeout)
-            except subprocess.TimeoutExpired:
-                logger.warning(f"{agent_id} did not stop gracefully, sending SIGKILL")
-                agent.process.kill()
-                agent.process.wait(timeout=5)
-        except ProcessLookupError:
-            pass  # Already dead
+                self._signal_group(agent.pid, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(asyncio.shield(watcher), timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"{agent_id} did not stop gracefully, sending SIGKILL")
+                    self._signal_group(agent.pid, signal.SIGKILL)
+                    await asyncio.wait_for(asyncio.shield(watcher), timeout=5)
+            except (ProcessLookupError, asyncio.TimeoutError):
+                pass  # Already dead, or unkillable; give up on it
+
+            if not watcher.done():
+                watcher.cancel()
+            agent.process = None
+            agent.pid = None
+            agent.watcher = None
+            logger.info(f"{agent_id} stopped")
+        finally:
+            self._set_state(agent, AgentState.STOPPED)
+            agent.stop_task = None
+            self._save_pids()
 
-        agent.state = AgentState.STOPPED
-        agent.process = None
-        agent.pid = None
-        self._close_logs(agent)
-        logger.info(f"{agent_id} stopped")
-        self._save_pids()
-        return True
+    async def _watch_process(self, agent: AgentInfo, process: asyncio.subprocess.Process):
+        """Wait for a child we spawned to exit and react immediately."""
+        exit_code = await process.wait()
+        if agent.process is process and agent.state == AgentState.RUNNING:
+            self._check_agent_restart(agent, exit_code)
+
+    async def _watch_pid(self, agent: AgentInfo, pid: int):
+        """Wait for a recovered (non-child) process to exit.
+
+        A pidfd becomes readable when the process exits, so this costs
+        nothing while it runs. Kernels without pidfd_open fall back to
+        probing the pid every 2 seconds.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            fd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            fd = None
+        try:
+            if fd is not None:
+                exited = loop.create_future()
+                loop.add_reader(fd, lambda: exited.done() or exited.set_result(None))
+                try:
+                    await exited
+                finally:
+                    loop.remove_reader(fd)
+            else:
+                while True:
+                    try:
+                        os.kill(pid, 0)
+                    except ProcessLookupError:
+                        break
+                    await asyncio.sleep(2)
+        finally:
+            if fd is not None:
+                os.close(fd)
+        if agent.pid == pid and agent.state == AgentState.RUNNING:
+            # Not our child, so its exit status is not available
+            self._check_agent_restart(agent, -1)
 
-    def _check_agent_restart(self, agent: AgentInfo):
+    def _check_agent_restart(self, agent: AgentInfo, exit_code: int):
         """Apply restart policy after an agent exits."""
-        exit_code = agent.process.returncode if agent.process else -1
-        agent.state = AgentState.STOPPED
+        uptime = time.time() - agent.started_at if agent.started_at else 0
+        self._set_state(agent, AgentState.STOPPED, exit_code=exit_code)
         agent.process = None
         agent.pid = None
-        self._close_logs(agent)
+        agent.watcher = None
+        self._save_pids()
 
         logger.warning(f"{agent.agent_id} exited with code {exit_code}")
 
@@ -215,18 +446,29 @@ class Supervisor:
         elif agent.restart_policy == RestartPolicy.ON_FAILURE and exit_code != 0:
             should_restart = True
 
+        if not self.running:
+            return
         if not should_restart:
             logger.info(f"{agent.agent_id}: restart policy = {agent.restart_policy.value}, not restarting")
             return
+        self._schedule_restart(agent, uptime)
+
+    def _schedule_restart(self, agent: AgentInfo, uptime: float):
+        """Respawn a stopped agent after its backoff, unless it hit the restart limit."""
+        if not self.running or agent.state != AgentState.STOPPED:
+            return
 
         # Check restart limit (10 restarts in 5 minutes)
         now = time.time()
         agent.restart_times = [t for t in agent.restart_times if now - t < 300]
         if len(agent.restart_times) >= 10:
-            logger.error(f"{agent.agent_id}: restart limit exceeded (10 in 5min), staying stopped")
+            logger.error(f"{agent.agent_id}: restart limit exceeded (10 in 5min), marking FAILED")
+            self._set_state(agent, AgentState.FAILED)
             return
 
-        # Exponential backoff
+        # Exponential backoff, reset after 60s of stable running
+        if uptime > 60:
+            agent.restart_backoff = 1.0
         agent.restart_count += 1
         delay = min(agent.restart_backoff, 16)
         agent.restart_backoff = min(agent.restart_backoff * 2, 16)
@@ -235,7 +477,15 @@ class Supervisor:
         agent.restart_times.append(now)
 
         # Schedule restart
-        asyncio.get_event_loop().call_later(delay, lambda: self.spawn_agent(agent.agent_id))
+        loop = asyncio.get_running_loop()
+        agent.restart_handle = loop.call_later(
+            delay, lambda: loop.create_task(self._restart_after_backoff(agent.agent_id))
+        )
+
+    async def _restart_after_backoff(self, agent_id: str):
+        self.agents[agent_id].restart_handle = None
+        if self.running:
+            await self.spawn_agent(agent_id)
 
     def _save_pids(self):
         """Save current PIDs for crash recovery."""
@@ -250,8 +500,15 @@ class Supervisor:
         with open(self.pids_file, "w") as f:
             json.dump(pids, f, indent=2)
 
-    def _try_recover_pids(self):
-        """On startup, try to re-attach to previously running agents."""
+    async def _restart_orphans(self):
+        """On startup, stop agents left running by a previous supervisor.
+
+        Their stdout/stderr were pipes read by the dead supervisor, so
+        their output is lost and their next write fails with EPIPE.
+        They are stopped here and respawned by start_all with fresh pipes.
+        A saved PID is only signalled if the process still carries its
+        agent's AGENT_ID, so a reused PID is never touched.
+        """
         if not self.pids_file.exists():
             return
 
@@ -261,66 +518,90 @@ class Supervisor:
         except Exception:
             return
 
+        orphans = []
         for agent_id, info in saved_pids.items():
             pid = info.get("pid")
             if not pid or agent_id not in self.agents:
                 continue
-
-            # Check if process is alive
             try:
-                os.kill(pid, 0)
-                logger.info(f"Recovered {agent_id} PID={pid} (still running)")
-                agent = self.agents[agent_id]
-                agent.pid = pid
-                agent.started_at = info.get("started_at", time.time())
-                agent.state = AgentState.RUNNING
-            except ProcessLookupError:
+                with open(f"/proc/{pid}/environ", "rb") as f:
+                    ours = f"AGENT_ID={agent_id}".encode() in f.read().split(b"\0")
+            except (FileNotFoundError, ProcessLookupError):
                 logger.info(f"Previous {agent_id} PID={pid} is dead, will respawn")
+                continue
+            except PermissionError:
+                ours = False
+            if not ours:
+                logger.info(f"PID={pid} is no longer {agent_id}, will respawn")
+                continue
 
-    async def _wait_for_ready(self, host: str, port: int, timeout: float = 30) -> bool:
-        """Wait for a TCP port to accept connections."""
-        start = time.time()
-        while time.time() - start < timeout:
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(1)
-                s.connect((host, port))
-                s.close()
-                return True
-            except (ConnectionRefusedError, socket.timeout, OSError):
-                await asyncio.sleep(1)
-        return False
+            logger.info(f"Restarting orphaned {agent_id} PID={pid} (its log pipes are gone)")
+            agent = self.agents[agent_id]
+            agent.pid = pid
+            agent.started_at = info.get("started_at", time.time())
+            self._set_state(agent, AgentState.RUNNING)
+            agent.watcher = asyncio.create_task(self._watch_pid(agent, pid))
+            orphans.append(agent_id)
+
+        if orphans:
+            await self.stop_agents(orphans)
+
+    def _probe_spec(self, agent: AgentInfo) -> dict:
+        """The agent's probe with paths resolved against the project dir."""
+        spec = dict(agent.probe)
+        if "path" in spec:
+            spec["path"] = str(self.project_dir / spec["path"])
+        if spec["type"] == "exec":
+            spec.setdefault("cwd", str(self.project_dir))
+        return spec
+
+    async def _start_when_ready(self, agent: AgentInfo, delay: float = 0):
+        """Start an agent as soon as its dependencies are ready, then probe it."""
+        try:
+            for dep in agent.depends_on:
+                if dep in self.agents:
+                    await self.agents[dep].ready.wait()
+            if delay:
+                await asyncio.sleep(delay)
+            if not self.running:
+                return
+            if agent.state in (AgentState.STOPPED, AgentState.FAILED):
+                await self.spawn_agent(agent.agent_id)
+
+            if agent.probe:
+                timeout = agent.probe.get("timeout", 60)
+                logger.info(f"Waiting for {agent.agent_id} to become ready...")
+                if await probes.wait_ready(self._probe_spec(agent), timeout=timeout):
+                    logger.info(f"{agent.agent_id} is ready!")
+                else:
+                    logger.warning(f"{agent.agent_id} not ready after {timeout}s, proceeding anyway...")
+        finally:
+            # Set even when it failed to start, so dependents are never stuck
+            agent.ready.set()
 
     async def start_all(self):
-        """Start all agents in dependency order."""
+        """Start all agents in dependency order.
+
+        Every agent waits only for the agents named in its depends_on to
+        pass their readiness probes, so independent parts of the stack
+        come up in parallel. User agents are staggered to spread load.
+        """
         self.running = True
         self.load_manifest()
-        self._try_recover_pids()
-
-        # Phase 1: Infrastructure
-        infra_agents = ["nostr-relay", "cashu-mint"]
-        for agent_id in infra_agents:
-            if agent_id in self.agents and self.agents[agent_id].state == AgentState.STOPPED:
-                self.spawn_agent(agent_id)
-
-        # Wait for infrastructure to be ready
-        logger.info("Waiting for relay (port 7777)...")
-        if await self._wait_for_ready("127.0.0.1", 7777, timeout=60):
-            logger.info("Relay is ready!")
-        else:
-            logger.warning("Relay not responding on port 7777, proceeding anyway...")
-
-        logger.info("Waiting for mint (port 3338)...")
-        if await self._wait_for_ready("127.0.0.1", 3338, timeout=60):
-            logger.info("Mint is ready!")
-        else:
-            logger.warning("Mint not responding on port 3338, proceeding anyway...")
+        await self._restart_orphans()
+        if any(agent.limits.get("hard") for agent in self.agents.values()):
+            self.cgroups = Cgroups.detect()
+        self._sample_task = asyncio.create_task(self._sample_loop())
 
-        # Phase 2: User agents
+        starters = []
+        users = 0
         for agent_id, agent in self.agents.items():
-            if agent_id.startswith("user") and agent.state == AgentState.STOPPED:
-                self.spawn_agent(agent_id)
-                await asyncio.sleep(0.5)  # Stagger startup
+            delay = 0.0
+            if agent_id.startswith("user"):
+                delay = 0.5 * users  # Stagger startup
+                users += 1
+            starters.append(self._start_when_ready(agent, delay))
+        await asyncio.gather(*starters)
 
         logger.info("All agents started!")
 
@@ -329,20 +610,19 @@ class Supervisor:
         logger.info("Initiating shutdown...")
         self.running = False
 
-        # Phase 1: Stop user agents (reverse order)
-        user_agents = sorted(
-            [a for a in self.agents.values() if a.agent_id.startswith("user")],
-            key=lambda a: a.agent_id,
-            reverse=True,
-        )
-        for agent in user_agents:
-            if agent.state != AgentState.STOPPED:
-                self.stop_agent(agent.agent_id)
+        # Phase 1: Stop all user agents at once
+        await self.stop_agents([a for a in self.agents if a.startswith("user")])
 
-        # Phase 2: Stop infrastructure
-        for agent_id in ["cashu-mint", "nostr-relay"]:
+        # Phase 2: Stop infrastructure, each tier after the one that uses it
+        for agent_id in ["wallet-daemon", "cashu-mint", "nostr-relay"]:
             if agent_id in self.agents:
-                self.stop_agent(agent_id)
+                await self.stop_agent(agent_id)
+
+        if self._sample_task:
+            self._sample_task.cancel()
+        if self.cgroups:
+            for agent_id in self.agents:
+                self.cgroups.remove(agent_id)
 
         # Close control socket
         if self.control_server:
@@ -350,90 +630,159 @@ class Supervisor:
             if self.control_socket_path.exists():
                 self.control_socket_path.unlink()
 
+        await self._close_logs()
         logger.info("Shutdown complete")
+        self._stopped.set()
+
+    async def _sample_loop(self):
+        """Sample every running agent's process group, check limits, publish samples.
+
+        Sampling runs every resource_sample_min_interval seconds while any
+        agent is busy (noticeable CPU, growing memory, or over a soft
+        limit) and backs off towards resource_sample_max_interval while
+        everything is idle.
+        """
+        min_interval = self.constants.get("resource_sample_min_interval", 1.0)
+        max_interval = self.constants.get("resource_sample_max_interval", 10.0)
+        interval = min_interval
+        loop = asyncio.get_running_loop()
+        while self.running:
+            pgids = {
+                agent.pid: agent.agent_id
+                for agent in self.agents.values()
+                if agent.pid and agent.state == AgentState.RUNNING
+            }
+            busy = False
+            if pgids:
+                try:
+                    totals = await loop.run_in_executor(None, self.sampler.read_groups, pgids)
+                    samples = self.sampler.record(pgids, totals, time.time())
+                except OSError as e:
+                    logger.warning(f"Resource sampling failed: {e}")
+                    samples = {}
+                for agent_id, sample in samples.items():
+                    agent = self.agents[agent_id]
+                    self.emit({"event": "sample", "agent": agent_id, **sample})
+                    self._check_limits(agent, sample)
+                    busy = busy or self._is_busy(agent, sample)
+            interval = min_interval if busy else min(interval * 1.5, max_interval)
+            await asyncio.sleep(interval)
+
+    def _is_busy(self, agent: AgentInfo, sample: dict) -> bool:
+        if agent.limit_strikes or (sample["cpu"] or 0) >= 10:
+            return True
+        series = self.sampler.series[agent.agent_id]
+        return len(series) >= 2 and sample["rss"] > series[-2]["rss"] * 1.05
+
+    def _check_limits(self, agent: AgentInfo, sample: dict):
+        """Restart an agent over a hard limit, or over a soft one for `sustain` samples.
+
+        Restarts go through _schedule_restart, so an agent that breaches a
+        limit again right after starting backs off and ends up FAILED.
+        """
+        limits = agent.limits
+        if not limits or agent.state != AgentState.RUNNING or agent.stop_task is not None:
+            return
+        kind = "hard"
+        hit = exceeded(limits.get("hard"), sample)
+        if hit is None:
+            kind = "soft"
+            hit = exceeded(limits.get("soft"), sample)
+            if hit is None:
+                agent.limit_strikes = 0
+                return
+            agent.limit_strikes += 1
+            if agent.limit_strikes < limits.get("sustain", 3):
+                return
+
+        name, value, threshold = hit
+        logger.warning(f"{agent.agent_id} over {kind} limit {name} ({value} > {threshold}), restarting")
+        self.emit({
+            "event": "limit",
+            "agent": agent.agent_id,
+            "limit": kind,
+            "metric": name,
+            "value": value,
+            "threshold": threshold,
+            "pid": agent.pid,
+            "ts": time.time(),
+        })
+        agent.limit_strikes = 0
+        agent.limit_restarts += 1
+        # Stop it like stop_agents would, then respawn through the same
+        # backoff and restart limit as a crash
+        uptime = time.time() - agent.started_at if agent.started_at else 0
+        agent.pending_limit_restart = True
+        agent.stop_task = asyncio.create_task(self._terminate(agent, agent.stop_timeout))
+        agent.stop_task.add_done_callback(lambda _: self._after_limit_stop(agent, uptime))
+
+    def _after_limit_stop(self, agent: AgentInfo, uptime: float):
+        """Respawn an agent stopped for a limit, unless it was stopped by hand meanwhile."""
+        if not agent.pending_limit_restart:
+            logger.info(f"{agent.agent_id}: stopped by request, not restarting after limit")
+            return
+        agent.pending_limit_restart = False
+        if agent.restart_policy == RestartPolicy.NEVER:
+            logger.info(f"{agent.agent_id}: restart policy = never, not restarting")
+            return
+        self._schedule_restart(agent, uptime)
 
     async def monitor_loop(self):
-        """Monitor running agents, detect exits, apply restart policy."""
-        while self.running:
-            for agent in self.agents.values():
-                if agent.state == AgentState.RUNNING and agent.process:
-                    ret = agent.process.poll()
-                    if ret is not None:
-                        self._check_agent_restart(agent)
-                    elif agent.started_at and (time.time() - agent.started_at > 60):
-                        # Reset backoff after 60s of stable running
-                        agent.restart_backoff = 1.0
-            await asyncio.sleep(2)
+        """Run until shutdown.
+
+        Exits are handled as they happen by each agent's watcher task
+        (asyncio child watcher for spawned agents, pidfd for recovered
+        ones), so there is nothing to poll here.
+        """
+        await self._stopped.wait()
 
     def get_status(self) -> str:
         """Format status table."""
         lines = [
-            f"{'Agent':<15} {'Name':<12} {'State':<10} {'PID':<8} {'Uptime':<10} {'Restarts'}",
-            "-" * 75,
+            f"{'Agent':<15} {'Name':<12} {'State':<10} {'PID':<8} {'Uptime':<10} {'CPU%':>6} {'RSS MB':>7} {'Restarts'}",
+            "-" * 90,
         ]
         for agent_id, agent in sorted(self.agents.items()):
+            row = self.agent_status(agent)
             uptime = ""
-            if agent.started_at and agent.state == AgentState.RUNNING:
-                secs = int(time.time() - agent.started_at)
-                mins, secs = divmod(secs, 60)
+            if row["uptime"] is not None:
+                mins, secs = divmod(int(row["uptime"]), 60)
                 hours, mins = divmod(mins, 60)
                 uptime = f"{hours}h {mins:02d}m"
 
+            cpu = f"{row['cpu']:.1f}" if row["cpu"] is not None else "-"
+            rss = f"{row['rss'] / 1048576:.1f}" if row["rss"] is not None else "-"
             lines.append(
-                f"{agent_id:<15} {agent.name:<12} {agent.state.value:<10} "
-                f"{str(agent.pid or '-'):<8} {uptime:<10} {agent.restart_count}"
+                f"{agent_id:<15} {agent.name:<12} {row['state']:<10} "
+                f"{str(row['pid'] or '-'):<8} {uptime:<10} {cpu:>6} {rss:>7} {row['restarts']}"
             )
         return "\n".join(lines)
 
     async def start_control_server(self):
-        """Start Unix domain socket control server for zapctl."""
+        """Start the Unix domain socket control server for zapctl (see control.py)."""
         if self.control_socket_path.exists():
             self.control_socket_path.unlink()
 
-        self.control_server = await asyncio.start_unix_server(
-            self._handle_control_client,
-            path=str(self.control_socket_path),
-        )
+        self.control_server = ControlServer(self, str(self.control_socket_path))
+        await self.control_server.start()
         logger.info(f"Control server listening on {self.control_socket_path}")
 
-    async def _handle_control_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        """Handle a zapctl connection."""
-        try:
-            data = await asyncio.wait_for(reader.read(4096), timeout=5)
-            if not data:
-                writer.close()
-                return
-
-            command = data.decode("utf-8").strip()
-            parts = command.split()
-            cmd = parts[0] if parts else ""
-            args = parts[1:] if len(parts) > 1 else []
-
-            response = await self._execute_command(cmd, args)
-            writer.write(response.encode("utf-8"))
-            await writer.drain()
-        except Exception as e:
-            writer.write(f"Error: {e}\n".encode("utf-8"))
-            await writer.drain()
-        finally:
-            writer.close()
-
     async def _execute_command(self, cmd: str, args: list) -> str:
-        """Execute a control command."""
+        """Execute a legacy text control command."""
         if cmd == "status":
             return self.get_status() + "\n"
 
         elif cmd == "stop" and args:
             agent_id = args[0]
             if agent_id in self.agents:
-                self.stop_agent(agent_id)
+                await self.stop_agent(agent_id)
                 return f"Stopped {agent_id}\n"
             return f"Unknown agent: {agent_id}\n"
 
         elif cmd == "start" and args:
             agent_id = args[0]
             if agent_id in self.agents:
-                if self.spawn_agent(agent_id):
+                if await self.spawn_agent(agent_id):
                     return f"Started {agent_id}\n"
                 return f"Failed to start {agent_id}\n"
             return f"Unknown agent: {agent_id}\n"
@@ -441,10 +790,9 @@ class Supervisor:
         elif cmd == "restart" and args:
             agent_id = args[0]
             if agent_id in self.agents:
-                self.stop_agent(agent_id)
-                await asyncio.sleep(1)
-                if self.spawn_agent(agent_id):
-                    return f"Restarted {agent_id}\n"
+                await self.stop_agent(agent_id)
+                if await self.spawn_agent(agent_id):
+                    return f"Restarted {agent_id} PID={self.agents[agent_id].pid}\n"
                 return f"Failed to restart {agent_id}\n"
             return f"Unknown agent: {agent_id}\n"
 
@@ -473,8 +821,15 @@ async def main():
     project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     supervisor = Supervisor(project_dir)
 
-    # Set up signal handlers
+    # Python < 3.12 defaults to one waitpid thread per child; a pidfd
+    # watcher reports exits through the event loop instead.
     loop = asyncio.get_event_loop()
+    if sys.version_info < (3, 12) and hasattr(os, "pidfd_open"):
+        watcher = asyncio.PidfdChildWatcher()
+        watcher.attach_loop(loop)
+        asyncio.set_child_watcher(watcher)
+
+    # Set up signal handlers
     for sig in (signal.SIGTERM, signal.SIGINT):
         loop.add_signal_handler(sig, lambda: asyncio.create_task(supervisor.shutdown()))
 
@@ -2,22 +2,39 @@
 """
 zapctl — CLI control tool for Zap Empire system-master.
 
-Communicates with system-master via Unix domain socket.
+Communicates with system-master via Unix domain socket, using the
+newline-delimited JSON protocol described in src/master/control.py.
 
 Usage:
-    zapctl status              Show all agent statuses
-    zapctl start <agent-id>    Start an agent
-    zapctl stop <agent-id>     Stop an agent
-    zapctl restart <agent-id>  Restart an agent
-    zapctl logs <agent-id>     Tail agent logs
+    zapctl status [agent|glob ...] [--json]
+                               Show agent statuses
+    zapctl start <agent|glob ...> [--group G]
+                               Start agents (e.g. zapctl start 'user*')
+    zapctl stop <agent|glob ...> [--group G] [--timeout S]
+                               Stop agents
+    zapctl restart <agent|glob ...> [--group G]
+                               Restart agents
+    zapctl resources [agent|glob ...] [--since 10m] [--sort cpu|rss|growth]
+                               CPU, memory (and its growth), fds per agent
+    zapctl watch [agent|glob ...] [--events state,sample,limit] [--json]
+                               Stream state changes, resource samples
+                               and limit violations
+    zapctl logs [agent-id|glob ...] [--level L] [--grep RE] [--since 10m] [--no-follow]
+                               Merged, filtered tail of agent logs (all by default)
+    zapctl logs --offer <id>   Show one trade's log lines across all agents
     zapctl shutdown            Shutdown entire system
 """
 
+import json
 import os
 import socket
-import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import Optional
+
+PROTOCOL_VERSION = 1
+MiB = 1024 * 1024
 
 
 def find_project_dir() -> Path:
@@ -35,81 +52,322 @@ def get_socket_path() -> Path:
     return project_dir / "data" / "system-master" / "control.sock"
 
 
-def send_command(command: str) -> str:
-    """Send a command to system-master via Unix socket."""
-    sock_path = get_socket_path()
-
-    if not sock_path.exists():
-        print("Error: system-master is not running (control socket not found)")
-        print(f"  Expected: {sock_path}")
-        sys.exit(1)
-
-    try:
-        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        sock.settimeout(10)
-        sock.connect(str(sock_path))
-        sock.sendall(command.encode("utf-8"))
-        sock.shutdown(socket.SHUT_WR)
-
-        response = b""
+class Control:
+    """Client for system-master's newline-delimited JSON control protocol."""
+
+    def __init__(self, timeout: Optional[float] = 10):
+        sock_path = get_socket_path()
+        if not sock_path.exists():
+            print("Error: system-master is not running (control socket not found)")
+            print(f"  Expected: {sock_path}")
+            sys.exit(1)
+        try:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(str(sock_path))
+        except ConnectionRefusedError:
+            print("Error: system-master is not accepting connections")
+            sys.exit(1)
+        self.file = self.sock.makefile("rb")
+        self.next_id = 1
+
+    def send(self, cmd: str, **args) -> int:
+        request_id = self.next_id
+        self.next_id += 1
+        message = {"v": PROTOCOL_VERSION, "id": request_id, "cmd": cmd, "args": args}
+        self.sock.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        return request_id
+
+    def receive(self) -> dict:
+        try:
+            line = self.file.readline()
+        except socket.timeout:
+            print("Error: system-master did not respond in time")
+            sys.exit(1)
+        if not line:
+            print("Error: system-master closed the connection")
+            sys.exit(1)
+        return json.loads(line)
+
+    def request(self, cmd: str, **args):
+        """Send one request and return its result (exits on error)."""
+        request_id = self.send(cmd, **args)
         while True:
-            chunk = sock.recv(4096)
-            if not chunk:
+            reply = self.receive()
+            if reply.get("id") == request_id and "watch" not in reply:
                 break
-            response += chunk
-
-        sock.close()
-        return response.decode("utf-8")
-
-    except ConnectionRefusedError:
-        print("Error: system-master is not accepting connections")
-        sys.exit(1)
-    except socket.timeout:
-        print("Error: system-master did not respond in time")
+        if not reply["ok"]:
+            print(f"Error: {reply['error']}")
+            sys.exit(1)
+        return reply["result"]
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def format_uptime(seconds) -> str:
+    if seconds is None:
+        return ""
+    mins, secs = divmod(int(seconds), 60)
+    hours, mins = divmod(mins, 60)
+    return f"{hours}h {mins:02d}m"
+
+
+def parse_targets(args: list, prog: str) -> dict:
+    """Agent ids/globs and --group into request args."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=f"zapctl {prog}")
+    parser.add_argument("agents", nargs="*", help="agent ids or globs")
+    parser.add_argument("--group", help='manifest group ("users", "infra", "all")')
+    parser.add_argument("--timeout", type=float, help="seconds before SIGKILL when stopping")
+    opts = parser.parse_args(args)
+    if not opts.agents and not opts.group:
+        parser.error("give agent ids/globs or --group")
+    request = {"agents": opts.agents}
+    if opts.group:
+        request["group"] = opts.group
+    if opts.timeout is not None:
+        request["timeout"] = opts.timeout
+    return request
+
+
+def cmd_status(args: list):
+    """Show status of all (or the selected) agents."""
+    as_json = "--json" in args
+    selectors = [a for a in args if a != "--json"]
+    control = Control()
+    rows = control.request("status", **({"agents": selectors} if selectors else {}))
+    control.close()
+    if as_json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(
+        f"{'Agent':<15} {'Name':<12} {'State':<10} {'PID':<8} {'Uptime':<10} "
+        f"{'CPU%':>6} {'RSS MB':>7} {'FDs':>5} {'Restarts'}"
+    )
+    print("-" * 90)
+    for row in rows:
+        cpu = f"{row['cpu']:.1f}" if row.get("cpu") is not None else "-"
+        rss = f"{row['rss'] / MiB:.1f}" if row.get("rss") is not None else "-"
+        fds = str(row["fds"]) if row.get("fds") is not None else "-"
+        restarts = str(row["restarts"])
+        if row.get("limit_restarts"):
+            restarts += f" ({row['limit_restarts']} over limit)"
+        print(
+            f"{row['agent']:<15} {row['name']:<12} {row['state']:<10} "
+            f"{str(row['pid'] or '-'):<8} {format_uptime(row['uptime']):<10} "
+            f"{cpu:>6} {rss:>7} {fds:>5} {restarts}"
+        )
+
+
+def parse_duration(text: str) -> float:
+    """"90s", "10m", "2h", "1d" or plain seconds."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def cmd_resources(args: list):
+    """Summarise each agent's recent resource samples (who leaks, who burns CPU)."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="zapctl resources")
+    parser.add_argument("agents", nargs="*", help="agent ids or globs (default: all)")
+    parser.add_argument("--group")
+    parser.add_argument("--since", default="10m", help="window, e.g. 90s, 10m, 2h (default 10m)")
+    parser.add_argument("--sort", choices=["agent", "cpu", "rss", "growth"], default="agent")
+    parser.add_argument("--json", action="store_true", help="print the raw samples")
+    opts = parser.parse_args(args)
+
+    request = {"agents": opts.agents, "since": time.time() - parse_duration(opts.since)}
+    if opts.group:
+        request["group"] = opts.group
+    control = Control()
+    series = control.request("resources", **request)
+    control.close()
+    if opts.json:
+        print(json.dumps(series, indent=2))
+        return
+
+    rows = []
+    for agent_id, samples in series.items():
+        if not samples:
+            continue
+        cpus = [s["cpu"] for s in samples if s["cpu"] is not None]
+        last = samples[-1]
+        # Trends only over the current process, not across restarts
+        first = next(s for s in samples if s["pid"] == last["pid"])
+        span = last["ts"] - first["ts"]
+        growth = (last["rss"] - first["rss"]) / MiB / span * 3600 if span > 0 else 0.0
+        ctxsw_rate = (last["ctxsw"] - first["ctxsw"]) / span if span > 0 else 0.0
+        rows.append({
+            "agent": agent_id,
+            "cpu": cpus[-1] if cpus else 0.0,
+            "cpu_avg": sum(cpus) / len(cpus) if cpus else 0.0,
+            "cpu_max": max(cpus) if cpus else 0.0,
+            "rss": last["rss"] / MiB,
+            "rss_max": max(s["rss"] for s in samples) / MiB,
+            "growth": growth,
+            "fds": last["fds"],
+            "ctxsw": ctxsw_rate,
+            "procs": last["procs"],
+            "samples": len(samples),
+        })
+    if opts.sort != "agent":
+        rows.sort(key=lambda r: r[opts.sort], reverse=True)
+
+    print(
+        f"{'Agent':<15} {'CPU%':>6} {'avg':>6} {'max':>6} {'RSS MB':>8} {'max':>8} "
+        f"{'MB/h':>8} {'FDs':>5} {'csw/s':>7} {'Procs':>5} {'Samples':>7}"
+    )
+    print("-" * 95)
+    for r in rows:
+        print(
+            f"{r['agent']:<15} {r['cpu']:>6.1f} {r['cpu_avg']:>6.1f} {r['cpu_max']:>6.1f} "
+            f"{r['rss']:>8.1f} {r['rss_max']:>8.1f} {r['growth']:>+8.1f} {r['fds']:>5} "
+            f"{r['ctxsw']:>7.1f} {r['procs']:>5} {r['samples']:>7}"
+        )
+
+
+def cmd_bulk(cmd: str, args: list):
+    """start / stop / restart agents by id, glob or group."""
+    request = parse_targets(args, cmd)
+    control = Control(timeout=None)
+    results = control.request(cmd, **request)
+    control.close()
+    failed = False
+    for agent_id, result in sorted(results.items()):
+        if result["ok"]:
+            detail = f" PID={result['pid']}" if result.get("pid") else ""
+            print(f"{agent_id}: ok{detail}")
+        else:
+            failed = True
+            print(f"{agent_id}: {result['error']}")
+    if failed:
         sys.exit(1)
 
 
-def cmd_status():
-    """Show status of all agents."""
-    print(send_command("status"), end="")
-
-
-def cmd_start(agent_id: str):
-    """Start a specific agent."""
-    print(send_command(f"start {agent_id}"), end="")
-
+def cmd_watch(args: list):
+    """Stream agent state transitions and resource samples."""
+    import argparse
 
-def cmd_stop(agent_id: str):
-    """Stop a specific agent."""
-    print(send_command(f"stop {agent_id}"), end="")
-
-
-def cmd_restart(agent_id: str):
-    """Restart a specific agent."""
-    print(send_command(f"restart {agent_id}"), end="")
+    parser = argparse.ArgumentParser(prog="zapctl watch")
+    parser.add_argument("agents", nargs="*", help="agent ids or globs (default: all)")
+    parser.add_argument("--group")
+    parser.add_argument("--events", default="state,sample,limit", help="comma-separated: state,sample,limit")
+    parser.add_argument("--json", action="store_true", help="print raw JSON events")
+    opts = parser.parse_args(args)
 
+    control = Control(timeout=None)
+    request = {"agents": opts.agents, "events": opts.events.split(",")}
+    if opts.group:
+        request["group"] = opts.group
+    control.request("watch", **request)
+    try:
+        while True:
+            event = control.receive()
+            if opts.json:
+                print(json.dumps(event), flush=True)
+                continue
+            stamp = time.strftime("%H:%M:%S", time.localtime(event.get("ts", time.time())))
+            if event.get("dropped"):
+                print(f"{stamp} ({event['dropped']} events dropped)")
+            if event["event"] == "state":
+                extra = f" exit={event['exit_code']}" if "exit_code" in event else ""
+                print(
+                    f"{stamp} {event['agent']:<15} {event['from']} -> {event['to']} "
+                    f"PID={event.get('pid') or '-'}{extra}",
+                    flush=True,
+                )
+            elif event["event"] == "sample":
+                cpu = f"{event['cpu']:.1f}%" if event.get("cpu") is not None else "-"
+                print(
+                    f"{stamp} {event['agent']:<15} cpu={cpu} rss={event['rss'] / MiB:.1f}MB "
+                    f"fds={event['fds']} ctxsw={event['ctxsw']} procs={event['procs']}",
+                    flush=True,
+                )
+            else:
+                fields = " ".join(
+                    f"{k}={v}" for k, v in event.items() if k not in ("v", "watch", "event", "agent", "ts", "dropped")
+                )
+                print(f"{stamp} {event['agent']:<15} {event['event']} {fields}", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        control.close()
+
+
+def cmd_logs(args: list):
+    """Merged, filtered tail of one or more agents' logs."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="zapctl logs")
+    parser.add_argument("agents", nargs="*", help="agent ids or globs (default: all)")
+    parser.add_argument("-n", "--lines", type=int, default=50)
+    parser.add_argument("--level", help="minimum level, e.g. WARNING")
+    parser.add_argument("--grep", help="regular expression to match")
+    parser.add_argument("--offer", help="only lines for this trade offer_id")
+    parser.add_argument("--since", help="start from this long ago, e.g. 90s, 10m, 2h")
+    parser.add_argument("--stream", choices=["stdout", "stderr", "both"], default="both")
+    parser.add_argument("--no-follow", action="store_true", help="print and exit")
+    parser.add_argument("--json", action="store_true", help="print raw JSON lines")
+    opts = parser.parse_args(args)
 
-def cmd_logs(agent_id: str):
-    """Tail logs for an agent."""
     project_dir = find_project_dir()
-    log_file = project_dir / "logs" / agent_id / "stdout.log"
-
-    if not log_file.exists():
-        print(f"No logs found for {agent_id}")
-        print(f"  Expected: {log_file}")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from src.master import logtail
+
+    logs_dir = project_dir / "logs"
+    agents = logtail.select_agents(logs_dir, opts.agents)
+    if not agents:
+        print(f"No logs found for {' '.join(opts.agents) or 'any agent'}")
+        print(f"  Expected under: {logs_dir}")
         sys.exit(1)
+    streams = ["stdout", "stderr"] if opts.stream == "both" else [opts.stream]
+    line_filter = logtail.LineFilter(opts.level, opts.grep, opts.offer)
+    since = None
+    if opts.since:
+        since = time.time() - parse_duration(opts.since)
 
     try:
-        subprocess.run(["tail", "-f", "-n", "50", str(log_file)])
+        for line in logtail.backlog(logs_dir, agents, streams, opts.lines, line_filter, since):
+            print(logtail.format_line(line, opts.json))
+        if opts.no_follow:
+            return
+        for line in logtail.follow(logs_dir, agents, streams, line_filter):
+            print(logtail.format_line(line, opts.json), flush=True)
     except KeyboardInterrupt:
         pass
 
 
+def cmd_logs_offer(offer_id: str):
+    """Print every indexed log line for a trade, from all agents, in time order."""
+    project_dir = find_project_dir()
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from src.master.logindex import LogIndex
+
+    index = LogIndex(str(project_dir / "logs"))
+    index.update()
+    lines = index.offer(offer_id)
+    index.close()
+    if not lines:
+        print(f"No log lines for offer {offer_id}")
+        sys.exit(1)
+    for line in lines:
+        print(line)
+
+
 def cmd_shutdown():
     """Shutdown entire system."""
     confirm = input("Shutdown all agents? [y/N] ")
     if confirm.lower() == "y":
-        print(send_command("shutdown"), end="")
+        control = Control()
+        control.request("shutdown")
+        control.close()
+        print("Shutdown initiated")
     else:
         print("Cancelled")
 
@@ -126,15 +384,17 @@ def main():
     cmd = sys.argv[1]
 
     if cmd == "status":
-        cmd_status()
-    elif cmd == "start" and len(sys.argv) >= 3:
-        cmd_start(sys.argv[2])
-    elif cmd == "stop" and len(sys.argv) >= 3:
-        cmd_stop(sys.argv[2])
-    elif cmd == "restart" and len(sys.argv) >= 3:
-        cmd_restart(sys.argv[2])
-    elif cmd == "logs" and len(sys.argv) >= 3:
-        cmd_logs(sys.argv[2])
+        cmd_status(sys.argv[2:])
+    elif cmd in ("start", "stop", "restart"):
+        cmd_bulk(cmd, sys.argv[2:])
+    elif cmd == "resources":
+        cmd_resources(sys.argv[2:])
+    elif cmd == "watch":
+        cmd_watch(sys.argv[2:])
+    elif cmd == "logs" and len(sys.argv) >= 4 and sys.argv[2] == "--offer":
+        cmd_logs_offer(sys.argv[3])
+    elif cmd == "logs":
+        cmd_logs(sys.argv[2:])
     elif cmd == "shutdown":
         cmd_shutdown()
     elif cmd in ("-h", "--help", "help"):
@@ -1,5 +1,7 @@
-from .client import NostrClient
+from .client import NostrClient, PublishResult
 from .event import Event
 from .crypto import KeyPair
+from .verify import EventVerifier
+from .mux import RelayMux, MuxSession
 
-__all__ = ["NostrClient", "Event", "KeyPair"]
+__all__ = ["NostrClient", "PublishResult", "Event", "KeyPair", "EventVerifier", "RelayMux", "MuxSession"]
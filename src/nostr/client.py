@@ -3,47 +3,98 @@
 import asyncio
 import json
 import logging
-from typing import AsyncGenerator, Dict, List, Tuple
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
 
 import websockets
 
 from .crypto import KeyPair
-from .event import Event
+from .dedup import SeenEvents
+from .event import Event, loads
+from .outbox import Outbox
+from .verify import EventVerifier
 
 logger = logging.getLogger(__name__)
 
+# Put on the verification queue when the reader task ends
+_PUMP_STOPPED = object()
+
+
+@dataclass
+class PublishResult:
+    """Outcome of a tracked publish, from the relay's OK frame (NIP-20)."""
+
+    event_id: str
+    accepted: bool
+    message: str = ""
+
 
 class NostrClient:
     """Async Nostr relay client.
 
     Handles connection, reconnection with exponential backoff,
     event publishing, subscriptions, and event deduplication.
+    Published events go through a bounded priority outbox drained by a
+    writer task, so a slow or reconnecting socket delays publishes instead
+    of losing them; unsent events are replayed once the socket is back.
+    If a verifier is given, incoming events are checked for a correct id
+    and signature before they are yielded from listen().
     """
 
-    def __init__(self, relay_url: str, keypair: KeyPair):
+    def __init__(
+        self,
+        relay_url: str,
+        keypair: KeyPair,
+        verifier: Optional[EventVerifier] = None,
+        publish_window: int = 64,
+        ack_timeout: float = 10.0,
+        outbox_size: int = 1000,
+    ):
         self.relay_url = relay_url
         self.keypair = keypair
+        self.verifier = verifier
         self.ws = None
         self._subscriptions: Dict[str, List[dict]] = {}
-        self._seen_events: set = set()
         self._max_seen = 10000
+        self._seen_events = SeenEvents(self._max_seen)
         self._connected = False
         self._reconnect_delay = 1
         self._max_reconnect_delay = 30
-        self._event_queue: asyncio.Queue = asyncio.Queue()
+        self._event_queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
         self._running = False
+        # Tracked publishes awaiting an OK frame, keyed by event id
+        self._pending_acks: Dict[str, asyncio.Future] = {}
+        self._ack_timers: Dict[str, asyncio.TimerHandle] = {}
+        # At most publish_window tracked events are handed to the outbox
+        # at once; the rest wait here, in order, for an OK to free a slot
+        self._publish_window = publish_window
+        self._windowed: set = set()
+        self._window_waiting: deque = deque()
+        self._admit_tasks: set = set()
+        self._ack_timeout = ack_timeout
+        # Outbound queue and its writer task
+        self._outbox = Outbox(outbox_size, on_drop=self._on_outbox_drop)
+        self._writer_task: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        self._connected_evt = asyncio.Event()
+        self._connect_lock = asyncio.Lock()
 
     async def connect(self):
         """Connect to relay with exponential backoff retry."""
         while True:
             try:
-                self.ws = await websockets.connect(self.relay_url)
+                self.ws = await self._open_socket()
                 self._connected = True
                 self._reconnect_delay = 1
                 logger.info(f"Connected to {self.relay_url}")
                 # Re-subscribe after reconnect
                 for sub_id, filters in self._subscriptions.items():
                     await self._send_req(sub_id, filters)
+                # Let the writer replay anything queued while we were down
+                self._connected_evt.set()
+                if self._writer_task is None or self._writer_task.done():
+                    self._writer_task = asyncio.create_task(self._writer_loop())
                 return
             except Exception as e:
                 logger.warning(
@@ -54,24 +105,155 @@ class NostrClient:
                     self._reconnect_delay * 2, self._max_reconnect_delay
                 )
 
-    async def disconnect(self):
-        """Close connection and stop listening."""
+    async def _open_socket(self):
+        """Open the transport; overridden by multiplexed sessions."""
+        return await websockets.connect(self.relay_url)
+
+    async def _reconnect(self, failed_ws):
+        """Reconnect once, however many tasks noticed the same dead socket."""
+        async with self._connect_lock:
+            if self.ws is not failed_ws and self._connected:
+                return  # someone else already reconnected
+            self._connected = False
+            self._connected_evt.clear()
+            await self.connect()
+
+    async def disconnect(self, flush_timeout: float = 5.0):
+        """Flush queued events, then close connection and stop listening."""
+        await self.flush(flush_timeout)
         self._running = False
         self._connected = False
+        self._connected_evt.clear()
+        if self._writer_task:
+            self._writer_task.cancel()
+            self._writer_task = None
         if self.ws:
             await self.ws.close()
 
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until the outbox is drained; returns False on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self._outbox) or self._in_flight:
+            if loop.time() >= deadline:
+                logger.warning(f"Flush timed out with {len(self._outbox)} events queued")
+                return False
+            await asyncio.sleep(0.02)
+        return True
+
     async def publish(self, event: Event) -> bool:
-        """Publish an event to the relay. Signs the event if not already signed."""
+        """Queue an event for the relay. Signs the event if not already signed.
+
+        Returns once the event is queued; the writer task sends it.
+        """
         if not event.sig:
             event.sign(self.keypair)
-        msg = json.dumps(["EVENT", event.to_dict()], ensure_ascii=False)
-        try:
-            await self.ws.send(msg)
-            return True
-        except Exception as e:
-            logger.error(f"Publish failed: {e}")
-            return False
+        await self._outbox.put(event)
+        return True
+
+    async def _writer_loop(self):
+        """Drain the outbox onto the socket, requeueing on send failure."""
+        while True:
+            event = await self._outbox.get()
+            self._in_flight += 1
+            try:
+                await self._connected_evt.wait()
+                ws = self.ws
+                try:
+                    await ws.send(event.to_message())
+                except Exception as e:
+                    logger.warning(f"Publish failed ({e}), requeueing kind {event.kind}")
+                    self._outbox.requeue(event)
+                    self._in_flight -= 1
+                    event = None
+                    await self._reconnect(ws)
+                    continue
+            except asyncio.CancelledError:
+                if event is not None:
+                    self._outbox.requeue(event)
+                raise
+            finally:
+                if event is not None:
+                    self._in_flight -= 1
+
+            if event.id in self._pending_acks:
+                self._ack_timers[event.id] = asyncio.get_running_loop().call_later(
+                    self._ack_timeout, self._resolve_ack,
+                    event.id, False, "timeout: no OK from relay",
+                )
+
+    def _on_outbox_drop(self, event: Event, reason: str):
+        logger.info(f"Dropped queued kind {event.kind} ({reason})")
+        self._resolve_ack(event.id, False, reason)
+
+    async def publish_tracked(self, event: Event) -> "asyncio.Future[PublishResult]":
+        """Publish an event and return a future resolved by the relay's OK.
+
+        Up to publish_window publishes may be in flight; beyond that the
+        event waits in a local queue and is handed to the outbox when an
+        earlier one resolves. This never waits for a slot, because the OK
+        frames that free slots are read by listen(), which is where trade
+        handlers call this from. For the same reason, callers in the
+        listen loop must not await the future inline; attach a done
+        callback instead.
+
+        The future resolves with accepted=False if the event is dropped
+        from the outbox or no OK arrives within ack_timeout of it being
+        sent. Tracking an event that is already tracked returns the
+        existing future.
+        """
+        if not event.sig:
+            event.sign(self.keypair)
+
+        existing = self._pending_acks.get(event.id)
+        if existing is not None:
+            return existing
+        future = asyncio.get_running_loop().create_future()
+        self._pending_acks[event.id] = future
+        event_id = event.id
+
+        def _release(_):
+            timer = self._ack_timers.pop(event_id, None)
+            if timer is not None:
+                timer.cancel()
+            self._pending_acks.pop(event_id, None)
+            if event_id in self._windowed:
+                self._windowed.discard(event_id)
+                self._admit_waiting()
+
+        future.add_done_callback(_release)
+        if len(self._windowed) < self._publish_window and not self._window_waiting:
+            self._windowed.add(event_id)
+            await self._outbox.put(event)
+        else:
+            self._window_waiting.append(event)
+        return future
+
+    def _admit_waiting(self):
+        """Move waiting tracked publishes into the outbox as slots free up."""
+        while self._window_waiting and len(self._windowed) < self._publish_window:
+            event = self._window_waiting.popleft()
+            if event.id not in self._pending_acks:
+                continue  # its future was cancelled while waiting
+            self._windowed.add(event.id)
+            task = asyncio.ensure_future(self._outbox.put(event))
+            self._admit_tasks.add(task)
+            task.add_done_callback(self._admit_tasks.discard)
+
+    async def publish_batch(self, events: List[Event]) -> List["asyncio.Future[PublishResult]"]:
+        """Pipeline a burst of events without waiting for each OK in turn.
+
+        Unsigned events are signed together in one batch first.
+        """
+        unsigned = [e for e in events if not e.sig]
+        if unsigned:
+            Event.sign_all(unsigned, self.keypair)
+        return [await self.publish_tracked(event) for event in events]
+
+    def _resolve_ack(self, event_id: str, accepted: bool, message: str):
+        future = self._pending_acks.get(event_id)
+        if future is not None and not future.done():
+            future.set_result(PublishResult(event_id, accepted, message))
 
     async def subscribe(self, sub_id: str, filters: List[dict]):
         """Subscribe to events matching the given filters."""
@@ -90,45 +272,112 @@ class NostrClient:
         msg = json.dumps(["CLOSE", sub_id])
         await self.ws.send(msg)
 
+    def stats(self) -> dict:
+        """Client-side counters for monitoring."""
+        stats = {"seen": self._seen_events.stats(), "outbox": self._outbox.stats()}
+        if self.verifier is not None:
+            stats["verify"] = self.verifier.stats()
+        return stats
+
     async def listen(self) -> AsyncGenerator[Tuple[str, Event], None]:
         """Listen for events from the relay. Async generator yielding (sub_id, event).
 
         Handles reconnection automatically on connection loss.
         Deduplicates events by their id.
         """
+        if self.verifier is None:
+            async for item in self._receive(dedup=True):
+                yield item
+            return
+
+        # Verified mode: a reader task feeds the queue while we pull
+        # batches off it. Dedup happens only after verification so a forged
+        # copy of an event cannot shadow the genuine one.
+        reader = asyncio.create_task(self._pump_events())
+        try:
+            stopped = False
+            while not stopped:
+                batch = []
+                item = await self._event_queue.get()
+                while True:
+                    if item is _PUMP_STOPPED:
+                        stopped = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.verifier.batch_size or self._event_queue.empty():
+                        break
+                    item = self._event_queue.get_nowait()
+
+                batch = [(sub_id, ev) for sub_id, ev in batch if ev.id not in self._seen_events]
+                if not batch:
+                    continue
+                results = await self.verifier.verify_batch([ev for _, ev in batch])
+                for (sub_id, event), ok in zip(batch, results):
+                    if not ok:
+                        logger.warning(f"Dropping event {event.id[:16]} with invalid id/sig")
+                        continue
+                    if self._mark_seen(event.id):
+                        yield (sub_id, event)
+            # Re-raises whatever ended the reader
+            await reader
+        finally:
+            reader.cancel()
+
+    async def _pump_events(self):
+        """Move raw events from the socket into the verification queue.
+
+        However it ends (other than by cancellation), a sentinel is queued
+        so listen() stops waiting and surfaces the reader's exception.
+        """
+        try:
+            async for item in self._receive(dedup=False):
+                await self._event_queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self._event_queue.put(_PUMP_STOPPED)
+            raise
+        await self._event_queue.put(_PUMP_STOPPED)
+
+    def _mark_seen(self, event_id: str) -> bool:
+        """Record an event id; returns False if it was already seen."""
+        return self._seen_events.add(event_id)
+
+    async def _receive(self, dedup: bool) -> AsyncGenerator[Tuple[str, Event], None]:
+        """Read EVENT messages off the socket, reconnecting as needed."""
         self._running = True
         while self._running:
+            ws = self.ws
             try:
-                async for raw_msg in self.ws:
-                    try:
-                        msg = json.loads(raw_msg)
-                    except json.JSONDecodeError:
-                        continue
+                async for raw_msg in ws:
+                    if isinstance(raw_msg, list):
+                        msg = raw_msg  # already decoded by a RelayMux
+                    else:
+                        try:
+                            msg = loads(raw_msg)
+                        except ValueError:
+                            continue
 
                     if msg[0] == "EVENT" and len(msg) >= 3:
+                        if not isinstance(msg[2], dict):
+                            logger.debug(f"Skipping malformed event on {msg[1]}")
+                            continue
                         sub_id = msg[1]
-                        event = Event.from_dict(msg[2])
-                        if event.id not in self._seen_events:
-                            self._seen_events.add(event.id)
-                            if len(self._seen_events) > self._max_seen:
-                                # Trim to half capacity
-                                self._seen_events = set(
-                                    list(self._seen_events)[self._max_seen // 2 :]
-                                )
+                        event = Event.from_wire(msg[2])
+                        if not dedup or self._mark_seen(event.id):
                             yield (sub_id, event)
-                    elif msg[0] == "OK":
-                        pass  # Publish confirmation
+                    elif msg[0] == "OK" and len(msg) >= 3:
+                        # Publish confirmation: ["OK", event_id, accepted, message]
+                        self._resolve_ack(msg[1], bool(msg[2]), msg[3] if len(msg) > 3 else "")
                     elif msg[0] == "EOSE":
                         pass  # End of stored events
                     elif msg[0] == "NOTICE":
                         logger.info(f"Relay notice: {msg[1]}")
             except websockets.ConnectionClosed:
                 logger.warning("Connection closed, reconnecting...")
-                self._connected = False
-                await self.connect()
+                await self._reconnect(ws)
             except Exception as e:
                 if self._running:
                     logger.error(f"Listen error: {e}, reconnecting...")
-                    self._connected = False
                     await asyncio.sleep(1)
-                    await self.connect()
+                    await self._reconnect(ws)
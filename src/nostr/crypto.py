@@ -2,11 +2,15 @@
 Nostr key management, BIP-340 Schnorr signatures, and NIP-04 encryption.
 
 Uses secp256k1 for signing, coincurve FFI for ECDH, pycryptodome for AES-256-CBC.
+ECDH shared secrets are cached per (our pubkey, their pubkey) pair.
 """
 
 import hashlib
 import os
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
 
 import secp256k1
 from coincurve import PrivateKey as CoinPrivateKey
@@ -28,10 +32,18 @@ _secp256k1_ctx = _lib.secp256k1_context_create(769)  # SIGN | VERIFY
 
 
 class KeyPair:
-    """Nostr keypair (secp256k1) with x-only public key."""
+    """Nostr keypair (secp256k1) with x-only public key.
+
+    The underlying secp256k1.PrivateKey (and its keypair struct) is built
+    once and reused for every signature; the x-only pubkey and its hex form
+    are computed up front since they are read on almost every event.
+    """
 
     def __init__(self, privkey: secp256k1.PrivateKey):
         self._privkey = privkey
+        # Compressed pubkey is 33 bytes (02/03 prefix + 32 bytes x-coordinate)
+        self._public_key = privkey.pubkey.serialize()[1:]
+        self._public_key_hex = self._public_key.hex()
 
     @classmethod
     def generate(cls) -> "KeyPair":
@@ -69,23 +81,31 @@ class KeyPair:
     @property
     def public_key(self) -> bytes:
         """X-only public key (32 bytes, no prefix)."""
-        # Compressed pubkey is 33 bytes (02/03 prefix + 32 bytes x-coordinate)
-        compressed = self._privkey.pubkey.serialize()
-        return compressed[1:]  # drop the 02/03 prefix
+        return self._public_key
 
     @property
     def public_key_hex(self) -> str:
-        return self.public_key.hex()
+        return self._public_key_hex
 
     @property
     def secret_key_hex(self) -> str:
         return self.secret_key.hex()
 
+    def sign(self, message_bytes: bytes) -> bytes:
+        """BIP-340 Schnorr signature over a 32-byte message hash."""
+        return self._privkey.schnorr_sign(message_bytes, '', raw=True)
+
+    def sign_many(self, ids: Iterable[str]) -> List[str]:
+        """Sign a batch of hex event ids, returning hex signatures in order."""
+        schnorr_sign = self._privkey.schnorr_sign
+        return [schnorr_sign(bytes.fromhex(i), '', raw=True).hex() for i in ids]
+
 
 def sign_schnorr(secret_key_bytes: bytes, message_bytes: bytes) -> bytes:
     """BIP-340 Schnorr signature over a 32-byte message hash.
 
-    Returns 64-byte signature.
+    Returns 64-byte signature. Builds a throwaway key on every call; prefer
+    KeyPair.sign when signing repeatedly with the same key.
     """
     privkey = secp256k1.PrivateKey(secret_key_bytes)
     sig = privkey.schnorr_sign(message_bytes, '', raw=True)
@@ -113,6 +133,15 @@ def _compute_shared_secret(our_privkey_hex: str, their_pubkey_hex: str) -> bytes
     Returns raw 32-byte x-coordinate of the shared point (parity-independent).
     Uses secp256k1 C library directly with a custom hash callback.
     """
+    return bytes(_ecdh_x_only(our_privkey_hex, their_pubkey_hex))
+
+
+def _ecdh_x_only(our_privkey_hex: str, their_pubkey_hex: str) -> bytearray:
+    """Run secp256k1_ecdh and return the x-coordinate in a mutable buffer.
+
+    The scratch buffer handed to libsecp256k1 is wiped before returning so
+    the only copy of the secret is the bytearray the caller owns.
+    """
     our_sk = CoinPrivateKey(bytes.fromhex(our_privkey_hex))
     pubkey_buf = _ffi.new('secp256k1_pubkey *')
     _lib.secp256k1_ec_pubkey_parse(
@@ -124,7 +153,91 @@ def _compute_shared_secret(our_privkey_hex: str, their_pubkey_hex: str) -> bytes
         _secp256k1_ctx, output, pubkey_buf,
         our_sk.secret, _ecdh_hash_x_only, _ffi.NULL,
     )
-    return bytes(_ffi.buffer(output, 32))
+    secret = bytearray(_ffi.buffer(output, 32))
+    _ffi.memmove(output, b"\x00" * 32, 32)
+    return secret
+
+
+def _zeroize(buf: bytearray) -> None:
+    """Overwrite a secret buffer in place."""
+    for i in range(len(buf)):
+        buf[i] = 0
+
+
+class SharedSecretCache:
+    """Bounded LRU cache of NIP-04 shared secrets.
+
+    Entries are keyed on (our x-only pubkey, their x-only pubkey), so each
+    counterparty costs one ECDH per keypair until it is evicted or expires.
+    Evicted and expired secrets are zeroized before being dropped.
+    """
+
+    def __init__(self, max_size: int = 256, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[bytearray, float]]" = OrderedDict()
+        # sha256(secret key) -> x-only pubkey hex, so the pubkey derivation
+        # (a full scalar multiplication) also happens once per keypair.
+        self._our_pubkeys: dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _our_pubkey(self, our_privkey_hex: str) -> str:
+        digest = hashlib.sha256(our_privkey_hex.encode("ascii")).digest()
+        pubkey = self._our_pubkeys.get(digest)
+        if pubkey is None:
+            if len(self._our_pubkeys) >= self.max_size:
+                self._our_pubkeys.clear()
+            sk = CoinPrivateKey(bytes.fromhex(our_privkey_hex))
+            pubkey = sk.public_key.format(compressed=True)[1:].hex()
+            self._our_pubkeys[digest] = pubkey
+        return pubkey
+
+    def get(self, our_privkey_hex: str, their_pubkey_hex: str) -> bytearray:
+        """Return the shared secret with a peer, computing it on a miss."""
+        key = (self._our_pubkey(our_privkey_hex), their_pubkey_hex.lower())
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None:
+            secret, created = entry
+            if self.ttl is None or now - created < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return secret
+            self._drop(key)
+
+        self.misses += 1
+        secret = _ecdh_x_only(our_privkey_hex, their_pubkey_hex)
+        self._entries[key] = (secret, now)
+        while len(self._entries) > self.max_size:
+            self._drop(next(iter(self._entries)))
+        return secret
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        secret, _ = self._entries.pop(key)
+        _zeroize(secret)
+        self.evictions += 1
+
+    def clear(self) -> None:
+        """Zeroize and drop every cached secret."""
+        for secret, _ in self._entries.values():
+            _zeroize(secret)
+        self._entries.clear()
+        self._our_pubkeys.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+shared_secret_cache = SharedSecretCache()
 
 
 def nip04_encrypt(sender_privkey_hex: str, recipient_pubkey_hex: str, plaintext: str) -> str:
@@ -132,7 +245,7 @@ def nip04_encrypt(sender_privkey_hex: str, recipient_pubkey_hex: str, plaintext:
 
     Returns: base64(ciphertext) + "?iv=" + base64(iv)
     """
-    shared_secret = _compute_shared_secret(sender_privkey_hex, recipient_pubkey_hex)
+    shared_secret = shared_secret_cache.get(sender_privkey_hex, recipient_pubkey_hex)
 
     iv = os.urandom(16)
     cipher = AES.new(shared_secret, AES.MODE_CBC, iv)
@@ -146,7 +259,7 @@ def nip04_encrypt(sender_privkey_hex: str, recipient_pubkey_hex: str, plaintext:
 
 def nip04_decrypt(recipient_privkey_hex: str, sender_pubkey_hex: str, encrypted_content: str) -> str:
     """NIP-04 decrypt: parse 'base64(ct)?iv=base64(iv)', decrypt with ECDH shared secret."""
-    shared_secret = _compute_shared_secret(recipient_privkey_hex, sender_pubkey_hex)
+    shared_secret = shared_secret_cache.get(recipient_privkey_hex, sender_pubkey_hex)
 
     # Parse "base64_ciphertext?iv=base64_iv"
     parts = encrypted_content.split("?iv=")
@@ -0,0 +1,48 @@
+"""Bounded event-id dedup cache for the listen path."""
+
+from typing import List, Optional
+
+
+class SeenEvents:
+    """Fixed-capacity set of recently seen event ids.
+
+    Backed by a ring buffer plus a set: adding an id when full overwrites
+    the oldest slot and drops that id from the set, so insertion and
+    eviction are both O(1) and memory never exceeds the capacity.
+    """
+
+    def __init__(self, capacity: int = 10000):
+        self.capacity = capacity
+        self._ring: List[Optional[str]] = [None] * capacity
+        self._pos = 0
+        self._ids: set = set()
+        self.evictions = 0
+        self.duplicates = 0
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, event_id: str) -> bool:
+        """Record an id; returns False if it was already present."""
+        if event_id in self._ids:
+            self.duplicates += 1
+            return False
+        oldest = self._ring[self._pos]
+        if oldest is not None:
+            self._ids.discard(oldest)
+            self.evictions += 1
+        self._ring[self._pos] = event_id
+        self._pos = (self._pos + 1) % self.capacity
+        self._ids.add(event_id)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._ids),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "duplicates": self.duplicates,
+        }
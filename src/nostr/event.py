@@ -3,13 +3,45 @@
 import hashlib
 import json
 import time
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from .crypto import KeyPair, sign_schnorr
+from .crypto import KeyPair, verify_schnorr
+
+try:
+    import orjson
+except ImportError:  # optional faster backend
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, byte-identical to json.dumps(separators=(",", ":"), ensure_ascii=False)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; let json handle it
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(raw):
+    """Parse a relay frame (str or bytes) with the fastest available backend."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
 class Event:
-    """Represents a Nostr event (NIP-01)."""
+    """Represents a Nostr event (NIP-01).
+
+    Slotted to keep per-event overhead low on busy subscriptions. Tags are
+    indexed by name lazily on the first get_tag/get_tags call; the index is
+    reset when tags is reassigned (not when the list is mutated in place).
+    """
+
+    __slots__ = (
+        "kind", "content", "_tags", "pubkey", "created_at", "id", "sig",
+        "_wire", "_wire_key", "_tag_index",
+    )
 
     def __init__(
         self,
@@ -28,24 +60,113 @@ class Event:
         self.created_at = created_at or int(time.time())
         self.id = id or ""
         self.sig = sig or ""
+        self._tag_index: Optional[Dict[str, List[List[str]]]] = None
+        # Memoized wire JSON, valid only for the (id, sig) it was built for
+        self._wire: Optional[str] = None
+        self._wire_key: Optional[Tuple[str, str]] = None
+
+    @property
+    def tags(self) -> List[List[str]]:
+        return self._tags
+
+    @tags.setter
+    def tags(self, value: List[List[str]]):
+        self._tags = value
+        self._tag_index = None
+
+    def _index(self) -> Dict[str, List[List[str]]]:
+        if self._tag_index is None:
+            index: Dict[str, List[List[str]]] = {}
+            for tag in self._tags:
+                if len(tag) >= 2:
+                    index.setdefault(tag[0], []).append(tag)
+            self._tag_index = index
+        return self._tag_index
+
+    def get_tag(self, name: str) -> Optional[str]:
+        """First value of the named tag, or None."""
+        tags = self._index().get(name)
+        return tags[0][1] if tags else None
+
+    def get_tags(self, name: str) -> List[str]:
+        """All values of the named tag, in order."""
+        return [tag[1] for tag in self._index().get(name, ())]
+
+    def _canonical_parts(self) -> Tuple[bytes, bytes, bytes, bytes]:
+        """Serialize each field once; shared by the id preimage and the wire form."""
+        return (
+            _dumps(self.pubkey),
+            _dumps(self.created_at) + b"," + _dumps(self.kind),
+            _dumps(self.tags),
+            _dumps(self.content),
+        )
+
+    @staticmethod
+    def _preimage(parts: Tuple[bytes, bytes, bytes, bytes]) -> bytes:
+        pubkey, created_kind, tags, content = parts
+        return b"[0," + pubkey + b"," + created_kind + b"," + tags + b"," + content + b"]"
+
+    def _build_wire(self, parts: Tuple[bytes, bytes, bytes, bytes]) -> str:
+        pubkey, created_kind, tags, content = parts
+        wire = b"".join((
+            b'{"id":', _dumps(self.id),
+            b',"pubkey":', pubkey,
+            b',"created_at":', created_kind.replace(b",", b',"kind":', 1),
+            b',"tags":', tags,
+            b',"content":', content,
+            b',"sig":', _dumps(self.sig),
+            b"}",
+        ))
+        self._wire = wire.decode("utf-8")
+        self._wire_key = (self.id, self.sig)
+        return self._wire
 
     def serialize_for_id(self) -> str:
         """NIP-01 serialization: [0, pubkey, created_at, kind, tags, content]"""
-        data = [0, self.pubkey, self.created_at, self.kind, self.tags, self.content]
-        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        return self._preimage(self._canonical_parts()).decode("utf-8")
 
     def compute_id(self) -> str:
         """Compute the event id (SHA-256 of the serialized event)."""
-        serialized = self.serialize_for_id()
-        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+        return hashlib.sha256(self._preimage(self._canonical_parts())).hexdigest()
 
     def sign(self, keypair: KeyPair):
-        """Sign this event with the given keypair. Sets pubkey, id, and sig."""
+        """Sign this event with the given keypair. Sets pubkey, id, and sig.
+
+        The wire form is built from the same serialized fields as the id
+        and memoized, so publishing does not serialize the event again.
+        """
         self.pubkey = keypair.public_key_hex
-        self.id = self.compute_id()
-        id_bytes = bytes.fromhex(self.id)
-        sig_bytes = sign_schnorr(keypair.secret_key, id_bytes)
-        self.sig = sig_bytes.hex()
+        parts = self._canonical_parts()
+        self.id = hashlib.sha256(self._preimage(parts)).hexdigest()
+        self.sig = keypair.sign(bytes.fromhex(self.id)).hex()
+        self._build_wire(parts)
+
+    def verify(self) -> bool:
+        """Check that id matches the content and sig is valid for pubkey."""
+        try:
+            if self.compute_id() != self.id:
+                return False
+            return verify_schnorr(
+                bytes.fromhex(self.pubkey),
+                bytes.fromhex(self.id),
+                bytes.fromhex(self.sig),
+            )
+        except (ValueError, TypeError):
+            return False
+
+    @staticmethod
+    def sign_all(events: List["Event"], keypair: KeyPair):
+        """Sign a burst of events with one keypair in a single batch."""
+        pubkey = keypair.public_key_hex
+        parts = []
+        for event in events:
+            event.pubkey = pubkey
+            parts.append(event._canonical_parts())
+            event.id = hashlib.sha256(event._preimage(parts[-1])).hexdigest()
+        sigs = keypair.sign_many(e.id for e in events)
+        for event, sig, event_parts in zip(events, sigs, parts):
+            event.sig = sig
+            event._build_wire(event_parts)
 
     def to_dict(self) -> dict:
         return {
@@ -70,5 +191,33 @@ class Event:
             sig=d.get("sig", ""),
         )
 
+    @classmethod
+    def from_wire(cls, d: dict) -> "Event":
+        """Build from a decoded relay event object, bypassing __init__.
+
+        Used on the listen path, where events arrive complete and the
+        keyword/default handling of from_dict is wasted work.
+        """
+        event = cls.__new__(cls)
+        # Relays can send malformed events; default like from_dict's optional fields
+        event.kind = d.get("kind", 0)
+        event.content = d.get("content", "")
+        event._tags = d.get("tags") or []
+        event.pubkey = d.get("pubkey", "")
+        event.created_at = d.get("created_at", 0)
+        event.id = d.get("id", "")
+        event.sig = d.get("sig", "")
+        event._tag_index = None
+        event._wire = None
+        event._wire_key = None
+        return event
+
     def to_json(self) -> str:
-        return json.dumps(self.to_dict(), ensure_ascii=False)
+        """Compact wire JSON of the event object, memoized once signed."""
+        if self._wire is not None and self._wire_key == (self.id, self.sig):
+            return self._wire
+        return self._build_wire(self._canonical_parts())
+
+    def to_message(self) -> str:
+        """The ["EVENT", <event>] relay message for publishing."""
+        return '["EVENT",' + self.to_json() + "]"
@@ -0,0 +1,229 @@
+"""One relay websocket shared by many keypairs in the same process.
+
+RelayMux owns the real socket. Each agent gets a MuxSession, which is a
+regular NostrClient whose transport is a channel on the mux instead of
+its own websocket. Subscription ids are namespaced per channel on the
+wire ("<channel>:<sub_id>") and incoming frames are routed back by that
+prefix. OK frames are routed by event id. Dedup, verification, the
+outbox and ack tracking all stay per session, unchanged.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Optional
+
+import websockets
+
+from .client import NostrClient
+from .crypto import KeyPair
+from .event import loads
+from .verify import EventVerifier
+
+logger = logging.getLogger(__name__)
+
+_EVENT_PREFIX = '["EVENT",{"id":"'
+
+
+def _closed() -> websockets.ConnectionClosed:
+    return websockets.ConnectionClosed(None, None)
+
+
+class _Channel:
+    """Websocket-like view of a RelayMux used as a MuxSession's transport.
+
+    The inbox is bounded: the mux reader serves every session, so it
+    cannot wait for one slow agent. When a session falls inbox_size
+    frames behind, its oldest frames are dropped.
+    """
+
+    def __init__(self, mux: "RelayMux", name: str, inbox_size: int = 1000):
+        self.mux = mux
+        self.name = name
+        self.subs: set = set()
+        self._inbox: asyncio.Queue = asyncio.Queue(maxsize=inbox_size)
+        self._open = True
+        self.dropped = 0
+
+    def _feed(self, msg: Optional[list]):
+        if self._inbox.full():
+            self._inbox.get_nowait()
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Mux channel {self.name} is behind, dropped {self.dropped} frames")
+        self._inbox.put_nowait(msg)
+
+    def _kill(self):
+        """Mux socket died: wake the reader so the session reconnects."""
+        self._open = False
+        self._feed(None)
+
+    async def send(self, raw: str):
+        if not self._open:
+            raise _closed()
+        if raw.startswith(_EVENT_PREFIX):
+            # Our own serializer puts the id first; route the OK back here
+            self.mux._route_ack(raw[len(_EVENT_PREFIX):len(_EVENT_PREFIX) + 64], self)
+        else:
+            msg = json.loads(raw)
+            if msg[0] in ("REQ", "CLOSE"):
+                sub_id = msg[1]
+                msg[1] = f"{self.name}:{sub_id}"
+                if msg[0] == "REQ":
+                    self.subs.add(sub_id)
+                else:
+                    self.subs.discard(sub_id)
+                raw = json.dumps(msg, ensure_ascii=False)
+            elif msg[0] == "EVENT":
+                self.mux._route_ack(msg[1]["id"], self)
+        await self.mux._send(raw)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._open:
+            raise _closed()
+        msg = await self._inbox.get()
+        if msg is None:
+            raise _closed()
+        return msg
+
+    async def close(self):
+        if self._open and self.mux.connected:
+            for sub_id in list(self.subs):
+                try:
+                    await self.mux._send(json.dumps(["CLOSE", f"{self.name}:{sub_id}"]))
+                except Exception:
+                    break
+        self._open = False
+        self.mux._channels.pop(self.name, None)
+
+
+class RelayMux:
+    """Shared relay connection with per-session demultiplexing."""
+
+    def __init__(self, relay_url: str, verifier: Optional[EventVerifier] = None):
+        self.relay_url = relay_url
+        self.verifier = verifier
+        self.ws = None
+        self.connected = False
+        self._ready = asyncio.Event()
+        self._channels: Dict[str, _Channel] = {}
+        self._ack_routes: Dict[str, _Channel] = {}
+        self._max_ack_routes = 10000
+        self._next_channel = 0
+        self._reader_task: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+        self._reconnect_delay = 1
+        self._max_reconnect_delay = 30
+
+    def session(self, keypair: KeyPair, **kwargs) -> "MuxSession":
+        """Create a NostrClient-compatible session for one keypair."""
+        kwargs.setdefault("verifier", self.verifier)
+        return MuxSession(self, keypair, **kwargs)
+
+    async def start(self):
+        """Connect (if needed) and start routing frames."""
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._run())
+        await self._ready.wait()
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            self._reader_task = None
+        self._mark_down()
+        if self.ws:
+            await self.ws.close()
+
+    def _open_channel(self) -> _Channel:
+        self._next_channel += 1
+        channel = _Channel(self, str(self._next_channel))
+        self._channels[channel.name] = channel
+        return channel
+
+    def _route_ack(self, event_id: str, channel: _Channel):
+        self._ack_routes[event_id] = channel
+        if len(self._ack_routes) > self._max_ack_routes:
+            # Relay never answered the oldest ones; forget them
+            del self._ack_routes[next(iter(self._ack_routes))]
+
+    async def _send(self, raw: str):
+        if not self.connected:
+            raise _closed()
+        async with self._send_lock:
+            await self.ws.send(raw)
+
+    def _mark_down(self):
+        self.connected = False
+        self._ready.clear()
+        for channel in list(self._channels.values()):
+            channel._kill()
+        self._channels.clear()
+        self._ack_routes.clear()
+
+    async def _run(self):
+        """Keep the shared socket up and route every incoming frame."""
+        while True:
+            try:
+                self.ws = await websockets.connect(self.relay_url)
+            except Exception as e:
+                logger.warning(f"Mux connection failed: {e}, retrying in {self._reconnect_delay}s")
+                await asyncio.sleep(self._reconnect_delay)
+                self._reconnect_delay = min(self._reconnect_delay * 2, self._max_reconnect_delay)
+                continue
+
+            self._reconnect_delay = 1
+            self.connected = True
+            self._ready.set()
+            logger.info(f"Mux connected to {self.relay_url}")
+            try:
+                async for raw_msg in self.ws:
+                    try:
+                        msg = loads(raw_msg)
+                    except ValueError:
+                        continue
+                    self._route(msg)
+            except websockets.ConnectionClosed:
+                logger.warning("Mux connection closed, reconnecting...")
+            except Exception as e:
+                logger.error(f"Mux read error: {e}, reconnecting...")
+                await asyncio.sleep(1)
+            self._mark_down()
+
+    def _route(self, msg: list):
+        if not msg:
+            return
+        kind = msg[0]
+        if kind in ("EVENT", "EOSE", "CLOSED") and len(msg) >= 2:
+            name, _, sub_id = str(msg[1]).partition(":")
+            channel = self._channels.get(name)
+            if channel is not None:
+                channel._feed([kind, sub_id] + msg[2:])
+        elif kind == "OK" and len(msg) >= 2:
+            channel = self._ack_routes.pop(msg[1], None)
+            if channel is not None:
+                channel._feed(msg)
+        elif kind == "NOTICE":
+            for channel in self._channels.values():
+                channel._feed(msg)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "channels": len(self._channels),
+            "pending_acks": len(self._ack_routes),
+        }
+
+
+class MuxSession(NostrClient):
+    """NostrClient whose transport is a channel on a shared RelayMux."""
+
+    def __init__(self, mux: RelayMux, keypair: KeyPair, **kwargs):
+        super().__init__(mux.relay_url, keypair, **kwargs)
+        self.mux = mux
+
+    async def _open_socket(self):
+        await self.mux.start()
+        return self.mux._open_channel()
@@ -0,0 +1,178 @@
+"""Bounded, prioritized outbound event queue with coalescing."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .event import Event
+
+logger = logging.getLogger(__name__)
+
+# Priority classes: lower value is sent first.
+PRIORITY_TRADE = 0
+PRIORITY_DEFAULT = 1
+PRIORITY_LOW = 2
+
+TRADE_KINDS = {4200, 4201, 4202, 4203, 4204, 4210, 9735}
+LOW_PRIORITY_KINDS = {1, 4300}
+
+
+def event_priority(event: Event) -> int:
+    """Trade protocol first, status and chat last, everything else between."""
+    if event.kind in TRADE_KINDS:
+        return PRIORITY_TRADE
+    if event.kind in LOW_PRIORITY_KINDS:
+        return PRIORITY_LOW
+    return PRIORITY_DEFAULT
+
+
+def coalesce_key(event: Event) -> Optional[Tuple]:
+    """Key under which a newer event supersedes an older queued one.
+
+    Listings (30078) are replaceable per d tag; 4300 status broadcasts only
+    matter in their latest form. Other kinds are never coalesced.
+    """
+    if event.kind == 30078:
+        return (event.pubkey, 30078, event.get_tag("d"))
+    if event.kind == 4300:
+        return (event.pubkey, 4300)
+    return None
+
+
+class _Item:
+    __slots__ = ("priority", "seq", "event", "key", "dropped")
+
+    def __init__(self, priority: int, seq: int, event: Event, key: Optional[Tuple]):
+        self.priority = priority
+        self.seq = seq
+        self.event = event
+        self.key = key
+        self.dropped = False
+
+    def __lt__(self, other: "_Item") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Outbox:
+    """Outbound queue drained by the client's writer task.
+
+    Bounded to maxsize live events. When full, an incoming event evicts the
+    newest queued event of a strictly lower priority; if there is none the
+    caller waits for space. on_drop is called with every event that is
+    discarded (superseded or evicted) so tracked publishes can be resolved.
+    """
+
+    def __init__(self, maxsize: int = 1000, on_drop: Optional[Callable[[Event, str], None]] = None):
+        self.maxsize = maxsize
+        self._on_drop = on_drop
+        self._heap: List[_Item] = []
+        self._by_key: Dict[Tuple, _Item] = {}
+        self._live = 0
+        self._dead = 0  # dropped items still in the heap
+        self._seq = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self.coalesced = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def _drop(self, item: _Item, reason: str):
+        item.dropped = True
+        self._live -= 1
+        self._dead += 1
+        if item.key is not None and self._by_key.get(item.key) is item:
+            del self._by_key[item.key]
+        if self._dead > max(64, self._live):
+            self._compact()
+        if self._on_drop:
+            self._on_drop(item.event, reason)
+
+    def _compact(self):
+        """Rebuild the heap without dropped items, so it stays bounded by maxsize."""
+        self._heap = [i for i in self._heap if not i.dropped]
+        heapq.heapify(self._heap)
+        self._dead = 0
+
+    def _update_flags(self):
+        if self._live > 0:
+            self._not_empty.set()
+        else:
+            self._not_empty.clear()
+        if self._live < self.maxsize:
+            self._not_full.set()
+        else:
+            self._not_full.clear()
+
+    def _evict_for(self, priority: int) -> bool:
+        victims = [i for i in self._heap if not i.dropped and i.priority > priority]
+        if not victims:
+            return False
+        victim = max(victims, key=lambda i: (i.priority, i.seq))
+        self._drop(victim, "evicted: outbound queue full")
+        self.evicted += 1
+        return True
+
+    async def put(self, event: Event):
+        """Queue a signed event, superseding any older event with its key."""
+        priority = event_priority(event)
+        key = coalesce_key(event)
+
+        if key is not None and key in self._by_key:
+            self._drop(self._by_key[key], "superseded by a newer event")
+            self.coalesced += 1
+
+        while self._live >= self.maxsize and not self._evict_for(priority):
+            self._update_flags()
+            await self._not_full.wait()
+
+        item = _Item(priority, next(self._seq), event, key)
+        heapq.heappush(self._heap, item)
+        if key is not None:
+            self._by_key[key] = item
+        self._live += 1
+        self._update_flags()
+
+    def requeue(self, event: Event):
+        """Put back an event whose send failed, ahead of its priority class."""
+        priority = event_priority(event)
+        key = coalesce_key(event)
+        if key is not None and key in self._by_key:
+            # A newer version was queued meanwhile
+            if self._on_drop:
+                self._on_drop(event, "superseded by a newer version")
+            return
+        item = _Item(priority, -next(self._seq), event, key)
+        heapq.heappush(self._heap, item)
+        if key is not None:
+            self._by_key[key] = item
+        self._live += 1
+        self._update_flags()
+
+    async def get(self) -> Event:
+        """Wait for and remove the highest-priority live event."""
+        while True:
+            await self._not_empty.wait()
+            while self._heap:
+                item = heapq.heappop(self._heap)
+                if item.dropped:
+                    self._dead -= 1
+                    continue
+                self._live -= 1
+                if item.key is not None and self._by_key.get(item.key) is item:
+                    del self._by_key[item.key]
+                self._update_flags()
+                return item.event
+            self._update_flags()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._live,
+            "maxsize": self.maxsize,
+            "coalesced": self.coalesced,
+            "evicted": self.evicted,
+        }
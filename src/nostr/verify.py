@@ -0,0 +1,86 @@
+"""Batched event integrity checking (NIP-01 id + BIP-340 signature)."""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .event import Event
+
+logger = logging.getLogger(__name__)
+
+
+class EventVerifier:
+    """Verifies event ids and signatures in batches on a worker thread pool.
+
+    Recomputing the id and checking the Schnorr signature are both done off
+    the event loop. Verified (id, sig) pairs are remembered in a bounded LRU,
+    so events replayed by the relay (reconnects, overlapping subscriptions)
+    skip the signature check; their id is always recomputed, since only
+    that binds the cached signature to the event's fields. One verifier
+    can be shared by several clients.
+    """
+
+    def __init__(self, max_workers: int = 2, batch_size: int = 64, cache_size: int = 20000):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="nostr-verify"
+        )
+        self._verified: OrderedDict = OrderedDict()  # (id, sig) -> None
+        self.cache_hits = 0
+        self.verified = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _check_batch(events: List[Event], cached: List[bool]) -> List[bool]:
+        results = []
+        for event, hit in zip(events, cached):
+            if hit:
+                # The (id, sig) pair is known good, but the id must still
+                # match this event's fields: a replayed id/sig on altered
+                # content, tags or pubkey is a forgery
+                try:
+                    results.append(event.compute_id() == event.id)
+                except (ValueError, TypeError):
+                    results.append(False)
+            else:
+                results.append(event.verify())
+        return results
+
+    async def verify_batch(self, events: List[Event]) -> List[bool]:
+        """Return a validity flag per event, in order."""
+        cached = []
+        for event in events:
+            key = (event.id, event.sig)
+            hit = key in self._verified
+            if hit:
+                self._verified.move_to_end(key)
+            cached.append(hit)
+
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._executor, self._check_batch, events, cached)
+        for event, hit, ok in zip(events, cached, results):
+            if not ok:
+                self.rejected += 1
+            elif hit:
+                self.cache_hits += 1
+            else:
+                self.verified += 1
+                self._verified[(event.id, event.sig)] = None
+        while len(self._verified) > self.cache_size:
+            self._verified.popitem(last=False)
+
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "cache_hits": self.cache_hits,
+            "cache_size": len(self._verified),
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -10,10 +10,13 @@ import time
 
 from src.nostr.client import NostrClient
 from src.nostr.event import Event
-from src.nostr.crypto import KeyPair
+from src.nostr.verify import EventVerifier
+from src.nostr.crypto import KeyPair, shared_secret_cache
+from src.wallet.accrual import ledger_for
 from src.wallet.manager import WalletManager
 from .personality import get_personality, AGENT_CONFIG
 from .chat import ChatGenerator
+from .jsonlog import log_fields, set_log_fields
 from .program_generator import ProgramGenerator
 from .sandbox import Sandbox
 from .trade_engine import TradeEngine
@@ -27,7 +30,7 @@ logger = logging.getLogger(__name__)
 class UserAgent:
     """Autonomous trading agent for Zap Empire."""
 
-    def __init__(self, agent_index: int, config: dict):
+    def __init__(self, agent_index: int, config: dict, mux=None):
         self.index = agent_index
         self.agent_id = f"user{agent_index}"
         self.config = config
@@ -50,6 +53,10 @@ class UserAgent:
         self.strategy = None
         self.reputation = None
 
+        # Shared RelayMux when hosted with other agents in one process
+        self._mux = mux
+        self._tasks = []
+
         # State
         self.running = False
         self.tick_count = 0
@@ -89,10 +96,13 @@ class UserAgent:
             logger.info(f"Generated new keypair: {self.keypair.public_key_hex[:16]}...")
 
         # 2. Init wallet
+        data_dir = self.config.get("data_dir", "data")
         self.wallet = WalletManager(
             self.agent_id,
             self.config.get("mint_url", "http://127.0.0.1:3338"),
-            self.config.get("data_dir", "data"),
+            data_dir,
+            check_consistency=self.config.get("wallet_consistency_check", False),
+            ledger=ledger_for(self.agent_id, self.config, data_dir),
         )
         try:
             await self.wallet.initialize()
@@ -100,10 +110,15 @@ class UserAgent:
             logger.warning(f"Wallet init failed (will retry): {e}")
 
         # 3. Init Nostr client
-        self.nostr = NostrClient(
-            self.config.get("relay_url", "ws://127.0.0.1:7777"),
-            self.keypair,
-        )
+        if self._mux is not None:
+            self.nostr = self._mux.session(self.keypair)
+        else:
+            verifier = EventVerifier() if self.config.get("verify_events") else None
+            self.nostr = NostrClient(
+                self.config.get("relay_url", "ws://127.0.0.1:7777"),
+                self.keypair,
+                verifier=verifier,
+            )
         await self.nostr.connect()
 
         # 4. Init other modules
@@ -137,22 +152,32 @@ class UserAgent:
         await self.nostr.publish(event)
         logger.info(f"[CHAT] {message}")
 
-    async def run(self):
-        """Main event loop."""
+    async def run(self, install_signal_handlers: bool = True):
+        """Main event loop.
+
+        When hosted alongside other agents the host owns the signal
+        handlers, so install_signal_handlers is False.
+        """
         self.running = True
+        # Inherited by every task below, so hosted agents' lines are tagged
+        set_log_fields(agent=self.agent_id)
 
         # Set up signal handlers
-        loop = asyncio.get_event_loop()
-        for sig in (signal.SIGTERM, signal.SIGINT):
-            loop.add_signal_handler(sig, lambda: asyncio.create_task(self.shutdown()))
+        if install_signal_handlers:
+            loop = asyncio.get_event_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, lambda: asyncio.create_task(self.shutdown()))
 
         # Start concurrent tasks
-        listen_task = asyncio.create_task(self._listen_loop())
-        tick_task = asyncio.create_task(self._tick_loop())
-        persist_task = asyncio.create_task(self._persist_loop())
+        self._tasks = [
+            asyncio.create_task(self._listen_loop()),
+            asyncio.create_task(self._tick_loop()),
+            asyncio.create_task(self._persist_loop()),
+            asyncio.create_task(self._shape_loop()),
+        ]
 
         try:
-            await asyncio.gather(listen_task, tick_task, persist_task)
+            await asyncio.gather(*self._tasks)
         except asyncio.CancelledError:
             pass
 
@@ -165,10 +190,22 @@ class UserAgent:
         self._save_state()
         self.reputation.save()
 
+        # Pay outstanding production costs; the ledger survives if this fails
+        try:
+            await self.wallet.settle()
+        except Exception as e:
+            logger.warning(f"Treasury settlement failed: {e}")
+
         # Close connections
         if self.nostr:
             await self.nostr.disconnect()
 
+        # Stop loops still sleeping or waiting on the relay
+        current = asyncio.current_task()
+        for task in self._tasks:
+            if task is not current:
+                task.cancel()
+
         logger.info(f"{self.name}: Shutdown complete")
 
     # --- Event Loops ---
@@ -181,7 +218,7 @@ class UserAgent:
             try:
                 await self._dispatch_event(event)
             except Exception as e:
-                logger.error(f"Error handling event kind={event.kind}: {e}")
+                logger.error(f"Error handling event kind={event.kind}: {e}", extra={"kind": event.kind})
 
     async def _tick_loop(self):
         """Autonomous activity loop."""
@@ -203,11 +240,25 @@ class UserAgent:
             self._save_state()
             self.reputation.save()
 
+    async def _shape_loop(self):
+        """Keep the wallet's denominations able to pay typical prices exactly."""
+        interval = self.config.get("wallet_shape_interval", 30)
+        max_amount = self.config.get("wallet_shape_max_sats", 31)
+        while self.running:
+            await asyncio.sleep(interval)
+            if not self.running:
+                break
+            try:
+                await self.wallet.shape_denominations(max_amount)
+            except Exception as e:
+                logger.warning(f"Denomination shaping failed: {e}")
+
     # --- Activity Tick ---
 
     async def _activity_tick(self):
         """One autonomous activity tick."""
         self.tick_count += 1
+        set_log_fields(tick=self.tick_count)
 
         # Check timeouts on active trades
         self.trade_engine.check_timeouts()
@@ -215,6 +266,14 @@ class UserAgent:
         # Decay trust scores
         self.reputation.decay_all()
 
+        # Pick up tokens deposited into our wallet by other processes,
+        # and pay accrued production costs once their batch is due
+        try:
+            await self.wallet.refresh_if_changed()
+            await self.wallet.settle(force=False)
+        except Exception as e:
+            logger.warning(f"Wallet refresh failed: {e}")
+
         # M5: Apply depreciation to all owned programs
         await self._apply_depreciation()
 
@@ -277,8 +336,8 @@ class UserAgent:
             self.stats["total_sats_spent"] += production_cost
             logger.info(f"Paid {production_cost} sats production cost for {program['name']}")
 
-        # Sandbox test
-        if not self.sandbox.test(program["source"]):
+        # Sandbox test (off the event loop; it blocks on a subprocess)
+        if not await asyncio.to_thread(self.sandbox.test, program["source"]):
             logger.warning(f"Program {program['name']} failed sandbox test")
             return
 
@@ -381,6 +440,10 @@ class UserAgent:
     async def _dispatch_event(self, event):
         """Route incoming events to appropriate handlers."""
         kind = event.kind
+        if kind in (4200, 4201, 4202, 4203, 4204, 4210):
+            with log_fields(kind=kind, offer_id=event.get_tag("offer_id")):
+                await self.trade_engine.handle_event(event)
+            return
 
         if kind == 0:
             self._on_metadata(event)
@@ -388,8 +451,6 @@ class UserAgent:
             pass  # Chat messages - just observe, no action needed
         elif kind == 30078:
             self.marketplace.on_listing(event)
-        elif kind in (4200, 4201, 4202, 4203, 4204, 4210):
-            await self.trade_engine.handle_event(event)
         elif kind == 9735:
             pass  # Zap receipt - logged but no action
 
@@ -464,6 +525,16 @@ class UserAgent:
         event.sign(self.keypair)
         await self.nostr.publish(event)
 
+        ecdh = shared_secret_cache.stats()
+        logger.info(
+            f"ECDH cache: {ecdh['hits']} hits, {ecdh['misses']} misses, "
+            f"{ecdh['size']} peers cached"
+        )
+        logger.info(
+            f"Payments: {self.wallet.exact_payments} exact, "
+            f"{self.wallet.swap_payments} via mint swap"
+        )
+
     # --- State Persistence ---
 
     def _save_state(self):
@@ -0,0 +1,112 @@
+"""AgentHost — run many UserAgents in one process on a shared event loop.
+
+All hosted agents share one RelayMux (a single relay websocket), the
+secp256k1 context, and the module-level template data, instead of each
+paying for its own interpreter. Agents are still started and stopped
+individually, and a crash in one agent only restarts that agent.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from src.nostr.mux import RelayMux
+from src.nostr.verify import EventVerifier
+from .agent import UserAgent
+
+logger = logging.getLogger(__name__)
+
+
+class AgentHost:
+    """Hosts a population of UserAgents over one relay connection."""
+
+    def __init__(self, config: dict):
+        self.config = config
+        verifier = EventVerifier() if config.get("verify_events") else None
+        self.mux = RelayMux(config.get("relay_url", "ws://127.0.0.1:7777"), verifier=verifier)
+        self.agents: Dict[int, UserAgent] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._restart_times: Dict[int, list] = {}
+        self.running = False
+
+    def start_agent(self, index: int) -> bool:
+        """Boot and run one agent in its own task."""
+        task = self._tasks.get(index)
+        if task is not None and not task.done():
+            logger.warning(f"user{index} is already running")
+            return False
+        self._tasks[index] = asyncio.create_task(self._run_agent(index), name=f"user{index}")
+        return True
+
+    async def stop_agent(self, index: int):
+        """Shut one agent down gracefully and forget its task."""
+        task = self._tasks.pop(index, None)
+        agent = self.agents.pop(index, None)
+        if agent is not None and agent.running:
+            try:
+                await agent.shutdown()
+            except Exception as e:
+                logger.error(f"user{index}: shutdown error: {e}")
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run_agent(self, index: int):
+        """Run one agent; on a crash, restart it with the supervisor's policy."""
+        backoff = 1.0
+        while self.running:
+            agent = UserAgent(index, self.config, mux=self.mux)
+            self.agents[index] = agent
+            started = time.time()
+            try:
+                await agent.boot()
+                await agent.run(install_signal_handlers=False)
+                return  # clean exit
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"user{index} crashed: {e}")
+                agent.running = False
+                # gather() does not cancel the siblings of a failed loop
+                for task in agent._tasks:
+                    task.cancel()
+                await asyncio.gather(*agent._tasks, return_exceptions=True)
+                if agent.nostr:
+                    await agent.nostr.disconnect(flush_timeout=0)
+
+            # Same limits as the system-master: 10 restarts in 5 minutes,
+            # exponential backoff reset after 60s of stable running.
+            now = time.time()
+            times = [t for t in self._restart_times.get(index, []) if now - t < 300]
+            if len(times) >= 10:
+                logger.error(f"user{index}: restart limit exceeded (10 in 5min), staying stopped")
+                return
+            times.append(now)
+            self._restart_times[index] = times
+            if now - started > 60:
+                backoff = 1.0
+            logger.info(f"user{index}: restarting in {backoff:.1f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 16)
+
+    async def run(self, indices, stagger: float = 0.5):
+        """Start the given agents and wait until all of them have stopped."""
+        self.running = True
+        await self.mux.start()
+        for index in indices:
+            self.start_agent(index)
+            await asyncio.sleep(stagger)
+        while self.running and any(not t.done() for t in self._tasks.values()):
+            await asyncio.sleep(1)
+
+    async def shutdown(self):
+        """Stop every agent, then close the shared connection."""
+        logger.info(f"Host shutting down {len(self._tasks)} agents...")
+        self.running = False
+        await asyncio.gather(
+            *(self.stop_agent(index) for index in list(self._tasks)),
+            return_exceptions=True,
+        )
+        await self.mux.close()
+        logger.info("Host shutdown complete")
@@ -0,0 +1,64 @@
+"""Structured JSON logging for user agents.
+
+JsonFormatter emits one JSON object per line, built with json.dumps so
+quotes and newlines in messages (chat lines, tracebacks) stay valid:
+
+    {"ts": "2026-10-16T12:00:00.123Z", "level": "INFO", "agent": "user3",
+     "logger": "src.user.trade_engine", "msg": "...", "tick": 42,
+     "offer_id": "1a2b3c4d", "kind": 4202}
+
+agent, tick, offer_id and kind come from a per-task context (see
+log_fields), so hosted agents sharing a process are told apart, or from
+extra={...} on an individual call. Fields that are unset are omitted.
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import time
+
+CONTEXT_FIELDS = ("agent", "tick", "offer_id", "kind")
+
+_context: contextvars.ContextVar = contextvars.ContextVar("log_fields", default={})
+
+
+def set_log_fields(**fields):
+    """Set fields for the rest of the current task (and tasks it creates)."""
+    _context.set({**_context.get(), **fields})
+
+
+@contextlib.contextmanager
+def log_fields(**fields):
+    """Set fields for the duration of a block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, agent: str = ""):
+        super().__init__()
+        self.agent = agent
+
+    def format(self, record: logging.LogRecord) -> str:
+        ms = int(record.msecs)
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{ms:03d}Z",
+            "level": record.levelname,
+            "agent": self.agent,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        context = _context.get()
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is None:
+                value = context.get(name)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
@@ -1,28 +1,57 @@
 """Entry point for running a user agent.
 
 Usage: python -m src.user.main <agent_index>
+       python -m src.user.main --hosted <indices>
 
-Where agent_index is 0-9 corresponding to the 10 agents.
+Where agent_index is 0-9 corresponding to the 10 agents. In hosted mode,
+indices is a list like "0-9" or "0,2,5" and all those agents run in this
+one process, sharing a single relay connection.
 """
 
 import asyncio
 import json
 import logging
+import signal
 import sys
 
 from .agent import UserAgent
+from .host import AgentHost
+from .jsonlog import JsonFormatter
+from .personality import AGENT_CONFIG
+
+
+def parse_indices(spec: str) -> list:
+    """Parse "0-9" / "0,2,5" / "0-3,7" into a list of agent indices."""
+    indices = []
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            indices.extend(range(int(lo), int(hi) + 1))
+        elif part:
+            indices.append(int(part))
+    return indices
 
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python -m src.user.main <agent_index>")
+        print("       python -m src.user.main --hosted <indices>")
         print("  agent_index: 0-9")
         sys.exit(1)
 
-    agent_index = int(sys.argv[1])
-    if agent_index < 0 or agent_index > 9:
-        print(f"Invalid agent index: {agent_index}. Must be 0-9.")
-        sys.exit(1)
+    hosted = sys.argv[1] == "--hosted"
+    if hosted:
+        if len(sys.argv) < 3:
+            print("Usage: python -m src.user.main --hosted <indices>")
+            sys.exit(1)
+        indices = parse_indices(sys.argv[2])
+    else:
+        indices = [int(sys.argv[1])]
+
+    for agent_index in indices:
+        if agent_index not in AGENT_CONFIG:
+            print(f"Invalid agent index: {agent_index}. Must be 0-9.")
+            sys.exit(1)
 
     # Load config
     with open("config/constants.json") as f:
@@ -33,19 +62,27 @@ def main():
         "mint_url": constants["mint_url"],
         "data_dir": "data",
         "tick_interval": constants.get("tick_interval_default", 60),
+        "verify_events": constants.get("verify_events", False),
+        "wallet_consistency_check": constants.get("wallet_consistency_check", False),
+        "wallet_shape_interval": constants.get("wallet_shape_interval", 30),
+        "wallet_shape_max_sats": constants.get("wallet_shape_max_sats", 31),
+        "treasury_accrual": constants.get("treasury_accrual", False),
+        "treasury_batch_count": constants.get("treasury_batch_count", 10),
+        "treasury_batch_sats": constants.get("treasury_batch_sats", 50),
+        "treasury_batch_seconds": constants.get("treasury_batch_seconds", 300),
     }
 
     # Setup logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format=(
-            '{"ts":"%(asctime)s","level":"%(levelname)s",'
-            f'"agent":"user{agent_index}","msg":"%(message)s"}}'
-        ),
-    )
+    agent_name = "host" if hosted else f"user{indices[0]}"
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter(agent_name))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
 
-    agent = UserAgent(agent_index, config)
-    asyncio.run(agent_main(agent))
+    if hosted:
+        asyncio.run(host_main(AgentHost(config), indices))
+    else:
+        agent = UserAgent(indices[0], config)
+        asyncio.run(agent_main(agent))
 
 
 async def agent_main(agent: UserAgent):
@@ -53,5 +90,12 @@ async def agent_main(agent: UserAgent):
     await agent.run()
 
 
+async def host_main(host: AgentHost, indices: list):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(host.shutdown()))
+    await host.run(indices)
+
+
 if __name__ == "__main__":
     main()
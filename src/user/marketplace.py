@@ -23,21 +23,14 @@ class Marketplace:
         except json.JSONDecodeError:
             return
 
-        d_tag = None
-        price_tag = None
-        categories = []
-        for tag in event.tags:
-            if len(tag) >= 2:
-                if tag[0] == "d":
-                    d_tag = tag[1]
-                elif tag[0] == "price":
-                    price_tag = int(tag[1])
-                elif tag[0] == "t":
-                    categories.append(tag[1])
-
+        d_tag = event.get_tag("d")
         if not d_tag:
             return
 
+        price = event.get_tag("price")
+        price_tag = int(price) if price is not None else None
+        categories = event.get_tags("t")
+
         self.listings[d_tag] = {
             "id": d_tag,
             "event_id": event.id,
@@ -77,10 +77,25 @@ class TradeEngine:
 
     def _get_tag(self, event, tag_name: str) -> Optional[str]:
         """Get first value of a tag from event."""
-        for tag in event.tags:
-            if len(tag) >= 2 and tag[0] == tag_name:
-                return tag[1]
-        return None
+        return event.get_tag(tag_name)
+
+    async def _publish_confirmed(self, event, offer_id: str):
+        """Publish a trade message and log if the relay does not accept it.
+
+        The OK is handled in a callback rather than awaited: this runs
+        inside the listen loop, which is what reads the OK frames.
+        """
+        future = await self.agent.nostr.publish_tracked(event)
+
+        def _on_ack(fut):
+            result = fut.result()
+            if not result.accepted:
+                logger.error(
+                    f"Relay did not accept kind {event.kind} for offer {offer_id}: "
+                    f"{result.message}"
+                )
+
+        future.add_done_callback(_on_ack)
 
     # --- Buyer-initiated actions ---
 
@@ -118,7 +133,10 @@ class TradeEngine:
         )
         trade.timeout_at = time.time() + self._timeouts["offer"]
         self.active_trades[offer_id] = trade
-        logger.info(f"Sent offer {offer_id}: {offer_sats} sats for {listing_id}")
+        logger.info(
+            f"Sent offer {offer_id}: {offer_sats} sats for {listing_id}",
+            extra={"offer_id": offer_id, "kind": 4200},
+        )
 
     # --- Seller event handlers ---
 
@@ -188,7 +206,7 @@ class TradeEngine:
             ],
         )
         event.sign(self.agent.keypair)
-        await self.agent.nostr.publish(event)
+        await self._publish_confirmed(event, offer_id)
 
         trade = Trade(
             offer_id=offer_id,
@@ -293,7 +311,7 @@ class TradeEngine:
             ],
         )
         event.sign(self.agent.keypair)
-        await self.agent.nostr.publish(event)
+        await self._publish_confirmed(event, offer_id)
         logger.info(f"Sent payment for offer {offer_id}: {amount} sats")
 
     async def on_trade_reject(self, event):
@@ -392,7 +410,7 @@ class TradeEngine:
             ],
         )
         event.sign(self.agent.keypair)
-        await self.agent.nostr.publish(event)
+        await self._publish_confirmed(event, offer_id)
         logger.info(f"Delivered program {listing_id} for offer {offer_id}")
 
     # --- Delivery handling (buyer side) ---
@@ -512,7 +530,8 @@ class TradeEngine:
             if trade.timeout_at and now > trade.timeout_at:
                 expired.append(offer_id)
                 logger.warning(
-                    f"Trade {offer_id} timed out in state {trade.state}"
+                    f"Trade {offer_id} timed out in state {trade.state}",
+                    extra={"offer_id": offer_id},
                 )
                 if trade.state in ("OFFERED", "PAID", "DELIVERED"):
                     event_type = (
@@ -0,0 +1,115 @@
+"""Accrual ledger for batched treasury deductions.
+
+Instead of one mint swap per production cost, WalletManager.deduct can
+record the cost here and settle the accumulated total to the treasury
+in a single token once a count, sats or age threshold is reached.
+
+The ledger is a small JSON file rewritten atomically (write to a temp
+file, fsync, rename) on every change, so a crash never loses an accrual
+or half-writes one. A settlement is recorded in the ledger (with its
+token) before the proofs are invalidated locally and cleared only after
+the token is in the treasury store, so a settlement interrupted by a
+crash is finished on the next start instead of being paid twice.
+"""
+
+import json
+import os
+import time
+from typing import List, Optional
+
+
+class AccrualLedger:
+    """Pending treasury debt of one agent, persisted to disk."""
+
+    def __init__(
+        self,
+        path: str,
+        max_count: int = 10,
+        max_sats: int = 50,
+        max_age: float = 300,
+    ):
+        self.path = path
+        self.max_count = max_count
+        self.max_sats = max_sats
+        self.max_age = max_age
+        self.entries: List[dict] = []
+        self.settling: Optional[dict] = None
+        self._load()
+
+    @property
+    def total(self) -> int:
+        """Sats owed to the treasury and not yet settled."""
+        return sum(e["amount"] for e in self.entries)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        self.entries = state.get("entries", [])
+        self.settling = state.get("settling")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"entries": self.entries, "settling": self.settling}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def add(self, amount: int, reason: str):
+        self.entries.append({"ts": int(time.time()), "amount": amount, "reason": reason})
+        self._save()
+
+    def due(self) -> bool:
+        """True when the pending batch should be settled."""
+        if not self.entries:
+            return False
+        return (
+            len(self.entries) >= self.max_count
+            or self.total >= self.max_sats
+            or time.time() - self.entries[0]["ts"] >= self.max_age
+        )
+
+    def begin_settlement(self, token: str) -> dict:
+        """Record the token paying the current batch before it is delivered.
+
+        Refuses while an earlier settlement is still pending: its token may
+        be the only record of proofs already taken from the wallet.
+        """
+        if self.settling:
+            raise RuntimeError("a treasury settlement is already pending")
+        self.settling = {
+            "ts": int(time.time()),
+            "amount": self.total,
+            "count": len(self.entries),
+            "token": token,
+        }
+        self._save()
+        return self.settling
+
+    def finish_settlement(self):
+        """The batch's token reached the treasury; forget the batch."""
+        count = self.settling["count"] if self.settling else 0
+        self.entries = self.entries[count:]
+        self.settling = None
+        self._save()
+
+
+def ledger_for(agent_id: str, config: dict, data_dir: str = "data") -> Optional[AccrualLedger]:
+    """The agent's ledger when config enables treasury_accrual, else None.
+
+    Every process that opens an agent's wallet (the agent itself, the
+    wallet daemon, agent_cli) builds it through here, so deduct and
+    balance mean the same thing whichever one serves the wallet.
+    """
+    if not config.get("treasury_accrual", False):
+        return None
+    return AccrualLedger(
+        os.path.join(data_dir, "treasury", "accrued", f"{agent_id}.json"),
+        max_count=config.get("treasury_batch_count", 10),
+        max_sats=config.get("treasury_batch_sats", 50),
+        max_age=config.get("treasury_batch_seconds", 300),
+    )
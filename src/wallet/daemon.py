@@ -0,0 +1,145 @@
+"""Wallet daemon — keeps every agent's Cashu wallet open behind a Unix socket.
+
+Without it, each agent_cli invocation builds a WalletManager, opens the
+wallet DB and runs load_mint()/load_proofs() just to answer one query.
+The daemon does that once per wallet and serves requests over a local
+socket using newline-delimited JSON:
+
+    request:  {"op": "balance", "agent": "user0"}
+    response: {"ok": true, "result": 100, "balance": 100}
+
+Ops: balance, create_payment (amount), receive_payment (token),
+deduct (amount). Every response carries the wallet's balance after the
+operation. Wallets are opened with the same accrual ledger the agents
+use (config/constants.json treasury_accrual), so a deduct served here
+accrues and settles exactly as it would in-process. Usage:
+python -m src.wallet.daemon
+"""
+
+import asyncio
+import json
+import logging
+import os
+import signal
+from typing import Dict, Optional
+
+from . import pool
+from .accrual import ledger_for
+from .manager import WalletManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.path.join("data", "wallet-daemon", "wallet.sock")
+
+
+class WalletDaemon:
+    """Serves wallet operations for all local agents from one process."""
+
+    def __init__(
+        self,
+        mint_url: str,
+        data_dir: str = "data",
+        socket_path: str = DEFAULT_SOCKET,
+        config: Optional[dict] = None,
+    ):
+        self.mint_url = mint_url
+        self.config = config or {}
+        self.data_dir = data_dir
+        self.socket_path = socket_path
+        self.wallets: Dict[str, WalletManager] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._server = None
+
+    async def get_wallet(self, agent_id: str) -> WalletManager:
+        """Open (once) and return an agent's wallet."""
+        wallet = self.wallets.get(agent_id)
+        if wallet is None:
+            wallet = WalletManager(
+                agent_id,
+                self.mint_url,
+                self.data_dir,
+                ledger=ledger_for(agent_id, self.config, self.data_dir),
+            )
+            await wallet.initialize()
+            self.wallets[agent_id] = wallet
+        return wallet
+
+    async def handle(self, request: dict) -> dict:
+        """Execute one request; operations on the same wallet are serialized."""
+        op = request.get("op")
+        agent_id = request.get("agent", "")
+        if not agent_id.startswith("user"):
+            return {"ok": False, "error": f"Unknown agent: {agent_id}"}
+
+        lock = self._locks.setdefault(agent_id, asyncio.Lock())
+        async with lock:
+            wallet = await self.get_wallet(agent_id)
+            if op == "balance":
+                await wallet.refresh_if_changed()
+                result = wallet.balance
+            elif op == "create_payment":
+                result = await wallet.create_payment(int(request["amount"]))
+            elif op == "receive_payment":
+                result = await wallet.receive_payment(request["token"])
+            elif op == "deduct":
+                result = await wallet.deduct(int(request["amount"]))
+            else:
+                return {"ok": False, "error": f"Unknown op: {op}"}
+            return {"ok": True, "result": result, "balance": wallet.balance}
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """One connection may carry any number of requests, one per line."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.handle(json.loads(line))
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(response) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionResetError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        logger.info(f"Wallet daemon listening on {self.socket_path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        await pool.close_shared()
+        logger.info("Wallet daemon stopped")
+
+
+async def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(name)s] %(levelname)s: %(message)s",
+    )
+    with open("config/constants.json") as f:
+        constants = json.load(f)
+
+    daemon = WalletDaemon(constants["mint_url"], config=constants)
+    await daemon.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await daemon.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,26 +1,69 @@
 """Cashu wallet manager for agent wallet operations."""
 
+import asyncio
 import logging
 import os
+from typing import Optional
+
+from . import pool
+from .accrual import AccrualLedger
+from .mintcache import MintCache
+from .treasury import TreasuryStore
 
 logger = logging.getLogger(__name__)
 
 
 class WalletManager:
-    """Manages a Cashu wallet for a single agent."""
-
-    def __init__(self, agent_id: str, mint_url: str, data_dir: str):
+    """Manages a Cashu wallet for a single agent.
+
+    Keeps a running balance and a proof index (secret -> proof) that are
+    updated after every mint, swap, invalidate and redeem, so reading the
+    balance is O(1). Proofs are only reloaded from the wallet DB when its
+    files were modified by something other than this manager (another
+    process such as agent_cli or the wallet daemon). With check_consistency
+    the running balance is cross-checked against the wallet after each
+    operation.
+
+    Payments are paid from an exact-sum subset of the proofs already held
+    when one exists, so the common case needs no mint round trip; only
+    amounts with no exact subset go through swap_to_send. shape_denominations()
+    re-splits idle proofs ahead of time so that every amount up to a target
+    can be paid exactly.
+
+    With an AccrualLedger, deduct() only records production costs and
+    settle() pays the accumulated total to the treasury in one token.
+    balance already excludes the accrued debt.
+    """
+
+    def __init__(
+        self,
+        agent_id: str,
+        mint_url: str,
+        data_dir: str,
+        check_consistency: bool = False,
+        ledger: Optional[AccrualLedger] = None,
+    ):
         self.agent_id = agent_id
         self.mint_url = mint_url
         self.data_dir = data_dir
         self.wallet = None
         self._initialized = False
+        self.check_consistency = check_consistency
+        self.ledger = ledger
+        self._treasury: Optional[TreasuryStore] = None
+        self._wallet_dir = os.path.join(data_dir, "wallets", agent_id)
+        self._proofs: dict = {}
+        self._balance = 0
+        self._db_stamp = None
+        self._lock = asyncio.Lock()
+        self.exact_payments = 0
+        self.swap_payments = 0
 
     async def initialize(self):
         """Initialize wallet and connect to mint."""
         from cashu.wallet.wallet import Wallet
 
-        wallet_dir = os.path.join(self.data_dir, "wallets", self.agent_id)
+        wallet_dir = self._wallet_dir
         os.makedirs(wallet_dir, exist_ok=True)
 
         self.wallet = await Wallet.with_db(
@@ -28,46 +71,235 @@ class WalletManager:
             db=wallet_dir,
             name=self.agent_id,
         )
-        await self.wallet.load_mint()
+        await pool.attach(self.wallet, self.mint_url)
+        await self._load_mint()
         await self.wallet.load_proofs()
+        self._rebuild_index()
         self._initialized = True
+        if self.check_consistency:
+            try:
+                await self.prune_spent()
+            except Exception as e:
+                logger.warning(f"{self.agent_id}: Spent-proof check failed: {e}")
+        if self.ledger and self.ledger.settling:
+            await self._recover_settlement()
         logger.info(
             f"Wallet initialized for {self.agent_id}, "
             f"balance: {self.balance} sats"
         )
 
+    async def _load_mint(self):
+        """load_mint(), skipped when the cached keysets are still current."""
+        cache = MintCache(os.path.join(self.data_dir, "mint-cache"))
+        try:
+            response = await pool.shared_client(self.mint_url).get("/v1/keysets")
+            response.raise_for_status()
+            keysets = response.json()["keysets"]
+        except Exception as e:
+            logger.debug(f"{self.agent_id}: keyset check failed ({e}), doing full mint load")
+            keysets = None
+
+        entry = cache.get(self.mint_url)
+        if keysets is not None and entry is not None and entry["keysets"] == keysets:
+            try:
+                self._restore_mint(entry)
+                await self.wallet.load_keysets_from_db(url=self.mint_url, unit=self.wallet.unit.name)
+                if self.wallet.keyset_id in self.wallet.keysets:
+                    return
+            except Exception as e:
+                logger.debug(f"{self.agent_id}: mint cache restore failed: {e}")
+
+        await self.wallet.load_mint()
+        if keysets is not None:
+            cache.put(self.mint_url, keysets, self.wallet.mint_info.dict())
+
+    def _restore_mint(self, entry: dict):
+        from cashu.wallet.mint_info import MintInfo
+
+        self.wallet.mint_info = MintInfo(**entry["info"])
+        unit = self.wallet.unit.name
+        active = [k["id"] for k in entry["keysets"] if k.get("active") and k.get("unit") == unit]
+        if not active:
+            raise ValueError(f"no active {unit} keyset")
+        self.wallet.keyset_id = active[0]
+
     @property
     def balance(self) -> int:
         """Available balance in sats."""
         if not self._initialized or not self.wallet:
             return 0
-        return sum(p.amount for p in self.wallet.proofs)
+        if self.ledger:
+            return self._balance - self.ledger.total
+        return self._balance
 
-    async def create_payment(self, amount: int) -> str:
-        """Create a Cashu token for sending.
+    # --- Proof index ---
 
-        Uses swap_to_send to select proofs, serializes them as a token.
-        After the caller confirms the recipient redeemed successfully,
-        the sent proofs are automatically spent at the mint.
+    def _db_state(self):
+        """(mtime_ns, size) of every wallet DB file, including WAL/journal."""
+        try:
+            return tuple(sorted(
+                (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                for e in os.scandir(self._wallet_dir) if e.is_file()
+            ))
+        except FileNotFoundError:
+            return None
+
+    def _rebuild_index(self):
+        """Index wallet.proofs from scratch (after a DB reload)."""
+        self._proofs = {p.secret: p for p in self.wallet.proofs}
+        self._balance = sum(p.amount for p in self._proofs.values())
+        self._db_stamp = self._db_state()
+
+    def _sync_index(self):
+        """Apply the difference between wallet.proofs and the index.
+
+        Called after our own operations; the wallet object already holds
+        the new proof set in memory, so no DB reload is needed.
+        """
+        current = {p.secret: p for p in self.wallet.proofs}
+        for secret in self._proofs.keys() - current.keys():
+            self._balance -= self._proofs.pop(secret).amount
+        for secret in current.keys() - self._proofs.keys():
+            proof = current[secret]
+            self._proofs[secret] = proof
+            self._balance += proof.amount
+        self._db_stamp = self._db_state()
+        if self.check_consistency:
+            self._check()
+
+    def _check(self):
+        expected = sum(p.amount for p in self.wallet.proofs)
+        if expected != self._balance or len(self._proofs) != len(self.wallet.proofs):
+            logger.error(
+                f"{self.agent_id}: balance index drifted "
+                f"({self._balance} indexed vs {expected} in wallet), rebuilding"
+            )
+            self._rebuild_index()
 
-        Returns serialized token string (cashuB...).
+    async def prune_spent(self) -> int:
+        """Drop proofs the mint reports as spent; returns the sats dropped.
+
+        The query goes through the process-wide checkstate batcher, so
+        wallets checking at the same time share one mint request.
         """
-        if amount > self.balance:
-            raise ValueError(f"Insufficient balance: {self.balance} < {amount}")
+        async with self._lock:
+            proofs = list(self._proofs.values())
+            if not proofs:
+                return 0
+            states = await pool.checkstate_batcher(self.mint_url).states([p.Y for p in proofs])
+            spent = [p for p in proofs if states.get(p.Y) == "SPENT"]
+            if spent:
+                await self.wallet.invalidate(spent)
+                self._sync_index()
+                logger.warning(
+                    f"{self.agent_id}: Dropped {len(spent)} proofs "
+                    f"({sum(p.amount for p in spent)} sats) already spent at the mint"
+                )
+            return sum(p.amount for p in spent)
+
+    async def refresh_if_changed(self) -> bool:
+        """Reload proofs only if another process modified the wallet DB."""
+        if not self._initialized:
+            return False
+        async with self._lock:
+            return await self._refresh_if_changed()
 
+    async def _refresh_if_changed(self) -> bool:
+        if self._db_state() == self._db_stamp:
+            return False
         await self.wallet.load_proofs()
+        self._rebuild_index()
+        logger.info(f"{self.agent_id}: wallet DB changed externally, balance now {self._balance} sats")
+        return True
 
-        # swap_to_send selects proofs to cover amount
-        keep_proofs, send_proofs = await self.wallet.swap_to_send(
-            self.wallet.proofs, amount
-        )
+    # --- Coin selection ---
 
-        # Serialize the send proofs as a cashu token
-        token = await self.wallet.serialize_proofs(send_proofs)
+    def _select_exact(self, amount: int):
+        """Proofs summing exactly to amount, or None.
+
+        Mint denominations are powers of two, for which taking the largest
+        proof that still fits finds an exact subset whenever one exists.
+        """
+        selected = []
+        remaining = amount
+        for proof in sorted(self._proofs.values(), key=lambda p: p.amount, reverse=True):
+            if proof.amount <= remaining:
+                selected.append(proof)
+                remaining -= proof.amount
+                if remaining == 0:
+                    return selected
+        return None
+
+    def covered_up_to(self) -> int:
+        """Largest N such that every amount 1..N can be paid exactly."""
+        covered = 0
+        for amount in sorted(p.amount for p in self._proofs.values()):
+            if amount > covered + 1:
+                break
+            covered += amount
+        return covered
+
+    async def _take(self, amount: int):
+        """Remove proofs worth exactly amount from the wallet and return them."""
+        send_proofs = self._select_exact(amount)
+        if send_proofs is not None:
+            self.exact_payments += 1
+        else:
+            # No exact subset: let the mint split a larger proof
+            _, send_proofs = await self.wallet.swap_to_send(self.wallet.proofs, amount)
+            self.swap_payments += 1
 
         # Invalidate send_proofs in local DB so they aren't reused.
         # They remain valid on the mint until the recipient redeems them.
         await self.wallet.invalidate(send_proofs)
+        self._sync_index()
+        return send_proofs
+
+    async def shape_denominations(self, max_amount: int) -> bool:
+        """Re-split idle proofs so every amount up to max_amount is exact.
+
+        A swap for 2^k - 1 sats comes back as one proof of each power of
+        two below 2^k, which covers every amount up to 2^k - 1. Both halves
+        of the swap stay in the wallet. Returns True if a swap was made.
+        """
+        if not self._initialized:
+            return False
+        async with self._lock:
+            await self._refresh_if_changed()
+            target = min(max_amount, self.balance)
+            if target <= 0 or self.covered_up_to() >= target:
+                return False
+            ladder = (1 << target.bit_length()) - 1
+            if ladder > self.balance:
+                ladder = (1 << (self.balance.bit_length() - 1)) - 1
+            if ladder <= 0:
+                return False
+            await self.wallet.swap_to_send(self.wallet.proofs, ladder)
+            self._sync_index()
+        logger.info(
+            f"{self.agent_id}: Re-split proofs, amounts up to "
+            f"{self.covered_up_to()} sats now payable exactly"
+        )
+        return True
+
+    async def create_payment(self, amount: int) -> str:
+        """Create a Cashu token for sending.
+
+        Pays from an exact-sum subset of held proofs when possible,
+        otherwise swaps at the mint; serializes them as a token. After
+        the caller confirms the recipient redeemed successfully, the
+        sent proofs are automatically spent at the mint.
+
+        Returns serialized token string (cashuB...).
+        """
+        async with self._lock:
+            await self._refresh_if_changed()
+            if amount > self.balance:
+                raise ValueError(f"Insufficient balance: {self.balance} < {amount}")
+            send_proofs = await self._take(amount)
+
+        # Serialize the send proofs as a cashu token
+        token = await self.wallet.serialize_proofs(send_proofs)
 
         logger.info(f"{self.agent_id}: Created payment of {amount} sats")
         return token
@@ -83,63 +315,133 @@ class WalletManager:
         token_obj = TokenV4.deserialize(token)
         proofs = token_obj.proofs
 
-        new_proofs, _ = await self.wallet.redeem(proofs)
+        async with self._lock:
+            await self._refresh_if_changed()
+            new_proofs, _ = await self.wallet.redeem(proofs)
+            self._sync_index()
 
-        await self.wallet.load_proofs()
         received = sum(p.amount for p in new_proofs)
         logger.info(f"{self.agent_id}: Received payment of {received} sats")
         return received
 
-    async def deduct(self, amount: int) -> bool:
+    async def deduct(self, amount: int, reason: str = "production_cost") -> bool:
         """Deduct sats from balance (production cost → treasury).
 
-        Creates a Cashu token and saves it to data/treasury/ for
-        system-master to redeem later. No sats are burned.
+        Creates a Cashu token and records it in the treasury store for
+        system-master to redeem later. No sats are burned. In accrual
+        mode the cost is only recorded and paid by a later settle().
         Returns True if deduction succeeded.
         """
         if not self._initialized:
             return False
         if amount <= 0:
             return True
-        if amount > self.balance:
-            return False
-
         try:
-            await self.wallet.load_proofs()
-
-            keep_proofs, send_proofs = await self.wallet.swap_to_send(
-                self.wallet.proofs, amount
-            )
+            async with self._lock:
+                await self._refresh_if_changed()
+                if amount > self.balance:
+                    return False
+                if self.ledger:
+                    self.ledger.add(amount, reason)
+                    logger.info(
+                        f"{self.agent_id}: Accrued {amount} sats for treasury "
+                        f"({self.ledger.total} sats pending)"
+                    )
+                    if self.ledger.due():
+                        # The cost is already accrued; a failed settlement
+                        # is retried later and does not fail the deduction
+                        try:
+                            await self._settle()
+                        except Exception as e:
+                            logger.warning(f"{self.agent_id}: Treasury settlement failed: {e}")
+                    return True
+                send_proofs = await self._take(amount)
 
             # Serialize as redeemable token
             token = await self.wallet.serialize_proofs(send_proofs)
+            self._append_treasury(amount, token, reason)
 
-            # Remove from local wallet
-            await self.wallet.invalidate(send_proofs)
-
-            # Save token to treasury for system-master to collect
-            import json, time
-            treasury_dir = os.path.join(self.data_dir, "treasury")
-            os.makedirs(treasury_dir, exist_ok=True)
-            entry = {
-                "ts": int(time.time()),
-                "agent": self.agent_id,
-                "amount": amount,
-                "token": token,
-                "reason": "production_cost",
-            }
-            with open(os.path.join(treasury_dir, "tokens.jsonl"), "a") as f:
-                f.write(json.dumps(entry) + "\n")
-
-            logger.info(f"{self.agent_id}: Paid {amount} sats to treasury (production cost)")
+            logger.info(f"{self.agent_id}: Paid {amount} sats to treasury ({reason})")
             return True
         except Exception as e:
             logger.error(f"{self.agent_id}: Deduct failed: {e}")
             return False
 
+    @property
+    def treasury(self) -> TreasuryStore:
+        if self._treasury is None:
+            self._treasury = TreasuryStore(os.path.join(self.data_dir, "treasury", "treasury.db"))
+        return self._treasury
+
+    def _append_treasury(self, amount: int, token: str, reason: str, count: int = 1):
+        """Save a token to the treasury for system-master to collect."""
+        self.treasury.add(self.agent_id, amount, token, reason, count=count)
+
+    async def settle(self, force: bool = True) -> int:
+        """Pay accrued treasury debt; unless force, only when a threshold is hit.
+
+        Returns the number of sats settled.
+        """
+        if not self._initialized or not self.ledger:
+            return 0
+        pending = self.ledger.entries and (force or self.ledger.due())
+        if not (pending or self.ledger.settling):
+            return 0
+        async with self._lock:
+            return await self._settle()
+
+    async def _settle(self) -> int:
+        if self.ledger.settling:
+            # An earlier batch failed after begin_settlement(); its proofs
+            # may already be gone, so deliver that token rather than
+            # paying the same costs again with a new one.
+            return await self._recover_settlement()
+        amount = self.ledger.total
+        if amount <= 0:
+            return 0
+        send_proofs = self._select_exact(amount)
+        if send_proofs is None:
+            _, send_proofs = await self.wallet.swap_to_send(self.wallet.proofs, amount)
+            self.swap_payments += 1
+        else:
+            self.exact_payments += 1
+        token = await self.wallet.serialize_proofs(send_proofs)
+
+        # Recorded before the proofs leave the wallet, so a crash from here
+        # on is finished by _recover_settlement() rather than paid again.
+        settlement = self.ledger.begin_settlement(token)
+        await self.wallet.invalidate(send_proofs)
+        self._sync_index()
+        self._append_treasury(amount, token, "production_cost", count=settlement["count"])
+        self.ledger.finish_settlement()
+        logger.info(
+            f"{self.agent_id}: Settled {amount} sats to treasury "
+            f"({settlement['count']} production costs)"
+        )
+        return amount
+
+    async def _recover_settlement(self) -> int:
+        """Finish a settlement interrupted by a crash or a failed delivery."""
+        from cashu.core.base import TokenV4
+
+        settlement = self.ledger.settling
+        secrets = {p.secret for p in TokenV4.deserialize(settlement["token"]).proofs}
+        still_held = [p for s, p in self._proofs.items() if s in secrets]
+        if still_held:
+            await self.wallet.invalidate(still_held)
+            self._sync_index()
+        # add() ignores a token that already reached the treasury
+        self._append_treasury(
+            settlement["amount"], settlement["token"], "production_cost",
+            count=settlement["count"],
+        )
+        self.ledger.finish_settlement()
+        logger.info(f"{self.agent_id}: Recovered interrupted treasury settlement of {settlement['amount']} sats")
+        return settlement["amount"]
+
     async def get_balance_info(self) -> dict:
         """Get detailed balance information."""
-        await self.wallet.load_proofs()
+        await self.refresh_if_changed()
         return {
             "available": self.balance,
         }
@@ -147,7 +449,8 @@ class WalletManager:
     async def mint_tokens(self, amount: int) -> int:
         """Mint new tokens via Lightning invoice."""
         quote = await self.wallet.request_mint(amount)
-        await self.wallet.mint(amount, quote_id=quote.quote)
-        await self.wallet.load_proofs()
+        async with self._lock:
+            await self.wallet.mint(amount, quote_id=quote.quote)
+            self._sync_index()
         logger.info(f"{self.agent_id}: Minted {amount} sats")
         return amount
@@ -0,0 +1,57 @@
+"""On-disk cache of mint info and keysets, shared by every wallet.
+
+Wallet.load_mint() fetches /v1/info and /v1/keysets (and keys for any
+keyset the wallet DB has not seen) on every boot and every agent_cli
+call. The keys themselves are already persisted in each wallet's DB, so
+the cache only needs the mint info and the keyset list: a boot with a
+valid cache makes a single GET /v1/keysets and compares it with the
+cached list. Only when the keysets changed (rotation, new unit, fee
+change) does it fall back to a full load_mint() and rewrite the cache.
+
+Entries are keyed by mint URL and carry CACHE_VERSION; an entry written
+by a different version is ignored.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional
+
+CACHE_VERSION = 1
+
+
+class MintCache:
+    """JSON files under cache_dir, one per mint URL."""
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, mint_url: str) -> str:
+        digest = hashlib.sha256(mint_url.rstrip("/").encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, mint_url: str) -> Optional[dict]:
+        try:
+            with open(self._path(mint_url)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("version") != CACHE_VERSION or entry.get("mint_url") != mint_url.rstrip("/"):
+            return None
+        return entry
+
+    def put(self, mint_url: str, keysets: List[dict], info: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "version": CACHE_VERSION,
+            "mint_url": mint_url.rstrip("/"),
+            "fetched": int(time.time()),
+            "keysets": keysets,
+            "info": info,
+        }
+        path = self._path(mint_url)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
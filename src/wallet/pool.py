@@ -0,0 +1,137 @@
+"""Shared HTTP connections to the mint for every wallet in a process.
+
+cashu's Wallet opens its own httpx.AsyncClient, so N wallets in one
+process (the wallet daemon, a hosted population, bootstrap) hold N
+connection pools to the same mint and pay TCP setup N times. attach()
+swaps a wallet's client for one pooled client per (event loop, mint).
+
+CheckStateBatcher merges concurrent /v1/checkstate queries from many
+wallets into one request. /v1/swap is not batched: a swap is atomic over
+all of its inputs, so merging wallets would let one bad proof fail every
+wallet's swap, and per-input fees do not add up exactly across a merge.
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 32
+
+_clients: Dict[Tuple[int, str], object] = {}
+_batchers: Dict[Tuple[int, str], "CheckStateBatcher"] = {}
+
+
+def _key(mint_url: str) -> Tuple[int, str]:
+    return (id(asyncio.get_running_loop()), mint_url.rstrip("/"))
+
+
+def shared_client(mint_url: str):
+    """The process-wide httpx.AsyncClient for a mint on the running loop."""
+    import httpx
+
+    key = _key(mint_url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=key[1],
+            timeout=60,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+            ),
+        )
+        _clients[key] = client
+    return client
+
+
+async def attach(wallet, mint_url: str):
+    """Make a cashu Wallet send its mint requests over the shared client."""
+    own = getattr(wallet, "httpx", None)
+    shared = shared_client(mint_url)
+    if own is shared:
+        return
+    wallet.httpx = shared
+    if own is not None:
+        await own.aclose()
+
+
+def checkstate_batcher(mint_url: str) -> "CheckStateBatcher":
+    key = _key(mint_url)
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = CheckStateBatcher(mint_url)
+    return batcher
+
+
+async def close_shared():
+    """Close every pooled client opened on the running loop."""
+    loop_id = id(asyncio.get_running_loop())
+    for key in [k for k in _clients if k[0] == loop_id]:
+        await _clients.pop(key).aclose()
+        _batchers.pop(key, None)
+
+
+class CheckStateBatcher:
+    """Coalesces concurrent proof-state queries into one /v1/checkstate call."""
+
+    def __init__(self, mint_url: str, window: float = 0.005, max_batch: int = 1000):
+        self.mint_url = mint_url
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_handle = None
+        self.requests = 0
+        self.queries = 0
+
+    async def states(self, ys: List[str]) -> Dict[str, str]:
+        """Map each Y (hash_to_curve of a proof secret) to UNSPENT/PENDING/SPENT."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for y in ys:
+            future = loop.create_future()
+            self._pending.setdefault(y, []).append(future)
+            futures.append(future)
+        self.queries += 1
+        if len(self._pending) >= self.max_batch:
+            self._schedule(0)
+        elif self._flush_handle is None:
+            self._schedule(self.window)
+        results = await asyncio.gather(*futures)
+        return dict(zip(ys, results))
+
+    def _schedule(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, lambda: loop.create_task(self._flush()))
+
+    async def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        ys = list(batch)
+        self.requests += 1
+        try:
+            response = await shared_client(self.mint_url).post("/v1/checkstate", json={"Ys": ys})
+            response.raise_for_status()
+            states = {s["Y"]: s["state"] for s in response.json()["states"]}
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for y, futures in batch.items():
+            for future in futures:
+                if future.done():
+                    continue
+                if y in states:
+                    future.set_result(states[y])
+                else:
+                    future.set_exception(ValueError(f"Mint returned no state for {y}"))
+
+    def stats(self) -> dict:
+        return {"queries": self.queries, "requests": self.requests}
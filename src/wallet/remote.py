@@ -0,0 +1,100 @@
+"""Clients for the wallet daemon (see daemon.py)."""
+
+import asyncio
+import json
+import socket
+from typing import Optional
+
+from .daemon import DEFAULT_SOCKET
+
+
+class WalletDaemonError(Exception):
+    """The daemon rejected a request or an operation failed inside it."""
+
+
+def daemon_available(socket_path: str = DEFAULT_SOCKET) -> bool:
+    """True if a daemon accepts connections on socket_path.
+
+    A daemon that crashed leaves its socket file behind, so the file
+    existing is not enough.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(1)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def request_sync(request: dict, socket_path: str = DEFAULT_SOCKET, timeout: float = 30) -> dict:
+    """Blocking one-shot request, for synchronous callers like heartbeat."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    finally:
+        sock.close()
+    response = json.loads(data)
+    if not response.get("ok"):
+        raise WalletDaemonError(response.get("error", "unknown error"))
+    return response
+
+
+class RemoteWallet:
+    """Drop-in stand-in for WalletManager backed by the wallet daemon.
+
+    balance is a plain attribute refreshed from every response, so callers
+    written against WalletManager.balance keep working synchronously.
+    """
+
+    def __init__(self, agent_id: str, socket_path: str = DEFAULT_SOCKET):
+        self.agent_id = agent_id
+        self.socket_path = socket_path
+        self.balance = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def initialize(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        await self._call("balance")
+
+    async def _call(self, op: str, **params):
+        async with self._lock:
+            request = {"op": op, "agent": self.agent_id, **params}
+            self._writer.write((json.dumps(request) + "\n").encode("utf-8"))
+            await self._writer.drain()
+            line = await self._reader.readline()
+        if not line:
+            raise WalletDaemonError("wallet daemon closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise WalletDaemonError(response.get("error", "unknown error"))
+        self.balance = response["balance"]
+        return response["result"]
+
+    async def create_payment(self, amount: int) -> str:
+        return await self._call("create_payment", amount=amount)
+
+    async def receive_payment(self, token: str) -> int:
+        return await self._call("receive_payment", token=token)
+
+    async def deduct(self, amount: int) -> bool:
+        return await self._call("deduct", amount=amount)
+
+    async def get_balance_info(self) -> dict:
+        return {"available": await self._call("balance")}
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
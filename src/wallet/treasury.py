@@ -0,0 +1,194 @@
+"""Treasury store — production-cost tokens collected from all agents.
+
+A SQLite database in WAL mode, so the ten agent processes can append
+concurrently while the system-master reads. Every token row carries a
+redemption state (pending / redeemed / failed). A totals table keyed by
+(agent, reason) is updated in the same transaction as each insert or
+state change, so the treasury total and the per-agent and per-reason
+aggregates are read without scanning the tokens.
+
+The legacy append-only data/treasury/tokens.jsonl is imported once on
+first open and renamed to tokens.jsonl.imported.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join("data", "treasury", "treasury.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    agent TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 1,
+    token TEXT NOT NULL UNIQUE,
+    state TEXT NOT NULL DEFAULT 'pending',
+    updated_ts INTEGER
+);
+CREATE INDEX IF NOT EXISTS tokens_state ON tokens(state, id);
+CREATE TABLE IF NOT EXISTS totals (
+    agent TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    sats INTEGER NOT NULL DEFAULT 0,
+    entries INTEGER NOT NULL DEFAULT 0,
+    redeemed_sats INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent, reason)
+);
+"""
+
+PENDING = "pending"
+REDEEMED = "redeemed"
+FAILED = "failed"
+
+
+class TreasuryStore:
+    """Indexed treasury ledger shared by all local processes."""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self._import_legacy()
+
+    def close(self):
+        self.conn.close()
+
+    def _import_legacy(self):
+        legacy = os.path.join(os.path.dirname(self.path), "tokens.jsonl")
+        if not os.path.exists(legacy):
+            return
+        imported = skipped = 0
+        with open(legacy) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                if not isinstance(entry, dict) or not entry.get("token"):
+                    skipped += 1
+                    continue
+                if self.add(
+                    entry.get("agent", ""), entry.get("amount", 0), entry["token"],
+                    entry.get("reason", "production_cost"),
+                    count=entry.get("count", 1), ts=entry.get("ts"),
+                ):
+                    imported += 1
+        try:
+            os.replace(legacy, legacy + ".imported")
+        except FileNotFoundError:
+            pass  # another process imported it first
+        logger.info(f"Imported {imported} treasury tokens from {legacy} ({skipped} unreadable lines skipped)")
+
+    def add(
+        self,
+        agent: str,
+        amount: int,
+        token: str,
+        reason: str = "production_cost",
+        count: int = 1,
+        ts: Optional[int] = None,
+    ) -> bool:
+        """Record a token; returns False if it was already recorded."""
+        with self._transaction():
+            cur = self.conn.execute(
+                "INSERT OR IGNORE INTO tokens (ts, agent, reason, amount, count, token) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (ts or int(time.time()), agent, reason, amount, count, token),
+            )
+            if cur.rowcount == 0:
+                return False
+            self.conn.execute(
+                "INSERT INTO totals (agent, reason, sats, entries) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (agent, reason) DO UPDATE SET "
+                "sats = sats + excluded.sats, entries = entries + excluded.entries",
+                (agent, reason, amount, count),
+            )
+        return True
+
+    def summary(self) -> dict:
+        """Treasury-wide totals."""
+        sats, entries, redeemed = self.conn.execute(
+            "SELECT COALESCE(SUM(sats), 0), COALESCE(SUM(entries), 0), "
+            "COALESCE(SUM(redeemed_sats), 0) FROM totals"
+        ).fetchone()
+        return {"total_sats": sats, "entries": entries, "redeemed_sats": redeemed}
+
+    def by_agent(self) -> Dict[str, dict]:
+        return self._aggregate("agent")
+
+    def by_reason(self) -> Dict[str, dict]:
+        return self._aggregate("reason")
+
+    def _aggregate(self, column: str) -> Dict[str, dict]:
+        rows = self.conn.execute(
+            f"SELECT {column}, SUM(sats), SUM(entries), SUM(redeemed_sats) "
+            f"FROM totals GROUP BY {column}"
+        )
+        return {
+            key: {"total_sats": sats, "entries": entries, "redeemed_sats": redeemed}
+            for key, sats, entries, redeemed in rows
+        }
+
+    def pending(self, limit: int = 100, after_id: int = 0) -> List[dict]:
+        """Unredeemed tokens in insertion order, for incremental redemption."""
+        rows = self.conn.execute(
+            "SELECT id, ts, agent, reason, amount, token FROM tokens "
+            "WHERE state = ? AND id > ? ORDER BY id LIMIT ?",
+            (PENDING, after_id, limit),
+        )
+        return [
+            {"id": r[0], "ts": r[1], "agent": r[2], "reason": r[3], "amount": r[4], "token": r[5]}
+            for r in rows
+        ]
+
+    def mark(self, token_id: int, state: str):
+        """Move a token to REDEEMED or FAILED (or back to PENDING)."""
+        with self._transaction():
+            row = self.conn.execute(
+                "SELECT agent, reason, amount, state FROM tokens WHERE id = ?", (token_id,)
+            ).fetchone()
+            if row is None or row[3] == state:
+                return
+            agent, reason, amount, old_state = row
+            self.conn.execute(
+                "UPDATE tokens SET state = ?, updated_ts = ? WHERE id = ?",
+                (state, int(time.time()), token_id),
+            )
+            delta = (amount if state == REDEEMED else 0) - (amount if old_state == REDEEMED else 0)
+            if delta:
+                self.conn.execute(
+                    "UPDATE totals SET redeemed_sats = redeemed_sats + ? "
+                    "WHERE agent = ? AND reason = ?",
+                    (delta, agent, reason),
+                )
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK, taking the write lock up front."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False